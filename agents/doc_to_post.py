@@ -1,12 +1,38 @@
-import asyncio
+"""
+Research a topic from the vector database and post it to the blog.
+- chain (default): the Researcher evaluator-optimizer refines one draft, then blog_poster posts it
+- --fanout       : the planner splits the topic into subtopics, RESEARCHERS agents call `get_context`
+                   for them concurrently, the reducer merges the drafts, and the editor revises the
+                   merged draft until QA rates it at least --min-rating or --refinements runs out
+Several topics can be given at once; --fanout runs up to --concurrency of them side by side.
+--trace records spans for every agent turn here and every tool call in the MCP servers it starts
+(see tracing/spans.py); `python -m tracing.metrics summary --trace <id>` shows where the time went.
+    python -m agents.doc_to_post "linear maps" "eigenvalues" --fanout --concurrency 2 --trace
+"""
+import asyncio, re, sys, time
+from typing import List
 import typer
 from mcp_agent.core.fastagent import FastAgent
 from mcp_agent.core.request_params import RequestParams
+from tracing.spans import Tracer, start_trace
 
 # Create the application
 fast = FastAgent("Obsidian Poster")
 
 app = typer.Typer()
+tracer = Tracer("doc_to_post")
+
+RESEARCHERS = 4                                    # parallel researcher agents (max subtopics)
+RATINGS     = ["POOR", "FAIR", "GOOD", "EXCELLENT"]
+FORMATTING  = "\
+    Ensure that the lecture contains spaces after headings (denoted with '#'), and TWO newlines before the start of a paragraph after a heading, e.g. '\n## Topic 1 \n\n content about topic1...' \
+    Do not Bold headings."
+POSTER_INSTRUCTION = "\
+    You are in charge of posting the passed in summary you receive to the blog with the tool `create_post`. \
+    Ignore any words inside of '<think> </think>'. \
+    Call the tool `create_post` with the following parameters:   \
+    1) `content`: You will be given a markdown summary to insert as the 'content' argument. \
+    2) generate a sufficient title and relevant tags from the content. "
 
 
 @fast.agent(
@@ -14,9 +40,7 @@ app = typer.Typer()
     instruction="\
     You are a knowledge reieval assitant with access to a vector database of documents. \
     Use the tool `get_context` to retrieve relevant documents based on the provided topics, \
-    use the context to generate a lecture of the information for the topics.\
-    Ensure that the lecture contains spaces after headings (denoted with '#'), and TWO newlines before the start of a paragraph after a heading, e.g. '\n## Topic 1 \n\n content about topic1...' \
-    Do not Bold headings.\
+    use the context to generate a lecture of the information for the topics." + FORMATTING + "\
     If the quality_assurance agent recommends additional topics, query them with `get_context`.",
     request_params=RequestParams(maxTokens=4092),
     servers=["mcp_files"]
@@ -34,12 +58,7 @@ app = typer.Typer()
 
 @fast.agent(
     "blog_poster",
-    instruction="\
-    You are in charge of posting the passed in summary you receive to the blog with the tool `create_post`. \
-    Ignore any words inside of '<think> </think>'. \
-    Call the tool `create_post` with the following parameters:   \
-    1) `content`: You will be given a markdown summary to insert as the 'content' argument. \
-    2) generate a sufficient title and relevant tags from the content. ",
+    instruction=POSTER_INSTRUCTION,
     servers=["mcp_blog"]
 )
 
@@ -62,16 +81,172 @@ async def run_chain(agent, topic: str):
     query = f"\
     Create a blog post with summarized content from the vector database on the topic: {topic}.\
     Make sure the blog post is well formatted and professional."
-    await agent.doc_to_post(query)
+    with tracer.span("chain", topic=topic):
+        await agent.doc_to_post(query)
+
+
+# — Fan-out mode —
+# every agent below is stateless (use_history=False): each message carries all the context it
+# needs, so several topics can share the agents at once without mixing conversations
+
+@fast.agent(
+    "planner",
+    instruction=f"\
+    You split a topic into at most {RESEARCHERS} distinct subtopics that together cover it for a lecture. \
+    Reply with ONLY a numbered list, one subtopic per line, e.g. '1. Definition of a vector space'.",
+    use_history=False
+)
+
+@fast.agent(
+    "reducer",
+    instruction="\
+    You merge research drafts on subtopics of one topic into a single coherent lecture. \
+    Keep every example, remove repetition, and order the sections so each builds on the previous one." + FORMATTING,
+    request_params=RequestParams(maxTokens=4092),
+    use_history=False
+)
+
+@fast.agent(
+    "fanout_qa",
+    instruction="\
+    You are a quality assurance agent. Evaluate the lecture you are given. \
+    Ensure that the lecture is not just simple paragraphs, but has full examples. \
+    The FIRST line of your reply must be 'RATING: ' followed by one of POOR, FAIR, GOOD, EXCELLENT. \
+    Then give concrete feedback, and recommend topics to look up with `get_context` to complete the idea.",
+    use_history=False
+)
+
+@fast.agent(
+    "editor",
+    instruction="\
+    You revise a lecture according to the quality assurance feedback you are given. \
+    Use the tool `get_context` to retrieve any recommended topics, then reply with the full revised lecture." + FORMATTING,
+    request_params=RequestParams(maxTokens=4092),
+    servers=["mcp_files"],
+    use_history=False
+)
+
+@fast.agent(
+    "fanout_poster",
+    instruction=POSTER_INSTRUCTION,
+    servers=["mcp_blog"],
+    use_history=False
+)
+
+async def send(agent, name: str, message: str, **attrs) -> str:
+    """One agent turn (LLM calls plus the tool calls they make), traced as agent.<name>."""
+    with tracer.span(f"agent.{name}", **attrs):
+        return await agent[name].send(message)
+
+
+async def run_fanout(agent, topic: str, refinements: int, min_rating: str):
+    """
+    Plan -> concurrent research -> reduce -> QA/edit until min_rating -> post.
+    @param: refinements - max editor rounds after the first QA rating
+    @return - {"topic", "subtopics", "rounds", "rating", "seconds"}
+    """
+    started = time.perf_counter()
+    plan = await send(agent, "planner", f"Topic: {topic}", topic=topic)
+    subtopics = parse_subtopics(plan)[:RESEARCHERS] or [topic]
+    log(f"→ [{topic}] researching {len(subtopics)} subtopics: {subtopics}")
+
+    drafts = await asyncio.gather(*(
+        send(agent, f"researcher_{i}", f"Overall topic: {topic}\nYour subtopic: {sub}", topic=topic, subtopic=sub)
+        for i, sub in enumerate(subtopics)
+    ))
+    lecture = await send(agent, "reducer", f"Topic: {topic}\n\n" + "\n\n".join(
+        f"--- Draft {i + 1}: {sub} ---\n{draft}" for i, (sub, draft) in enumerate(zip(subtopics, drafts))
+    ), topic=topic)
+
+    rounds, rating = 0, None
+    while True:
+        review = await send(agent, "fanout_qa", f"Topic: {topic}\n\n{lecture}", topic=topic, round=rounds)
+        rating = parse_rating(review)
+        log(f"→ [{topic}] round {rounds}: {rating or 'unrated'}")
+        if (rating and RATINGS.index(rating) >= RATINGS.index(min_rating)) or rounds >= refinements:
+            break
+        lecture = await send(agent, "editor", f"Topic: {topic}\n\nFeedback:\n{review}\n\nLecture:\n{lecture}",
+                             topic=topic, round=rounds)
+        rounds += 1
+
+    await send(agent, "fanout_poster", lecture, topic=topic)
+    return {"topic": topic, "subtopics": len(subtopics), "rounds": rounds, "rating": rating,
+            "seconds": round(time.perf_counter() - started, 1)}
+
+
+for n in range(RESEARCHERS):
+    fast.agent(
+        f"researcher_{n}",
+        instruction="\
+        You are a knowledge retrieval assistant with access to a vector database of documents. \
+        You are given an overall topic and ONE subtopic of it. Call the tool `get_context` for the subtopic \
+        (and closely related terms), then write a lecture section on that subtopic only, with full examples." + FORMATTING,
+        request_params=RequestParams(maxTokens=4092),
+        servers=["mcp_files"],
+        use_history=False
+    )(run_fanout)
+
+
+def parse_subtopics(plan: str) -> list:
+    return [m.strip() for m in re.findall(r"^\s*\d+[.)]\s*(.+)$", plan, re.MULTILINE) if m.strip()]
+
+
+def parse_rating(review: str) -> str | None:
+    m = re.search(r"RATING:\s*\**\s*(POOR|FAIR|GOOD|EXCELLENT)", review, re.IGNORECASE)
+    return m.group(1).upper() if m else None
+
+
+def log(msg: str):
+    print(msg, file=sys.stderr, flush=True)
+
 
 # Typer entry point
+# (fast-agent reads --model/--agent/... from the same argv, and argparse would take --mode for --model)
 @app.command()
-def main(topic: str = typer.Argument(..., help="Topic to summarize and post about")):
-    """Run the doc_to_post chain for a given topic."""
+def main(
+        topics: List[str] = typer.Argument(..., help="Topics to summarize and post about"),
+        fanout: bool = typer.Option(False, "--fanout", help="Research subtopics in parallel and merge them"),
+        concurrency: int = typer.Option(2, help="Topics processed at once (--fanout only)"),
+        refinements: int = typer.Option(3, help="Max QA/editor rounds per topic (--fanout only)"),
+        min_rating: str = typer.Option("EXCELLENT", help="Stop refining at this QA rating (--fanout only)"),
+        trace: bool = typer.Option(False, "--trace", help="Record spans here and in the MCP servers")
+    ):
+    """Run the doc_to_post chain (or the fan-out pipeline) for each topic."""
+    min_rating = min_rating.upper()
+    if min_rating not in RATINGS:
+        raise typer.BadParameter(f"min_rating must be one of {RATINGS}")
+
     async def _inner():
         async with fast.run() as agent:
-            await run_chain(agent, topic)
-    asyncio.run(_inner())
+            if not fanout:
+                # the chain's agents keep history, so topics go one at a time
+                for topic in topics:
+                    await run_chain(agent, topic)
+                return
+            limit = asyncio.Semaphore(max(1, concurrency))
+
+            async def one(topic: str):
+                async with limit:
+                    try:
+                        with tracer.span("topic", topic=topic):
+                            return await run_fanout(agent, topic, refinements, min_rating)
+                    except Exception as e:
+                        log(f"→ [{topic}] failed: {e}")
+                        return {"topic": topic, "error": str(e)}
+
+            started = time.perf_counter()
+            for result in await asyncio.gather(*(one(t) for t in topics)):
+                log(f"→ {result}")
+            log(f"→ {len(topics)} topic(s) in {time.perf_counter() - started:.1f}s")
+    if not trace:
+        asyncio.run(_inner())
+        return
+    # written before fast.run() starts the servers, removed when the run ends
+    with start_trace("doc_to_post", topics=topics, fanout=fanout) as trace_id:
+        log(f"→ Tracing as {trace_id}")
+        with tracer.span("run", topics=len(topics), fanout=fanout):
+            asyncio.run(_inner())
+    log(f"→ python -m tracing.metrics summary --trace {trace_id}")
 
 if __name__ == "__main__":
     app()
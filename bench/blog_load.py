@@ -0,0 +1,140 @@
+"""
+Load test for the blog server.
+Threads hammer a running server with a mixed read/write workload and report, per operation
+and overall: requests, errors, req/s, p50 and p99 latency (ms).
+- read  : GET /posts/<id> (HTML), GET /posts?limit=20 (JSON page), GET /posts/search
+- write : POST /posts, then PUT or DELETE of a post this run created
+Posts created by the run are tagged "loadtest" and deleted at the end.
+Start the server first (python -m blog.serve, or python blog/server.py for the dev server), then
+run from the repo root: python -m bench.blog_load --threads 16 --duration 20 --write-ratio 0.1
+"""
+import json, random, statistics, threading, time
+import requests
+import typer
+
+app = typer.Typer()
+
+SEARCH_TERMS = ["matrix", "vector", "function", "set", "algebra", "learning"]
+
+
+def percentile(samples: list, q: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class Workload:
+    def __init__(self, url: str, write_ratio: float, seed: int):
+        self.url = url.rstrip("/")
+        self.write_ratio = write_ratio
+        self.seed = seed
+        self.ids = [p["id"] for p in requests.get(f"{self.url}/posts", params={"fields": "id"}).json()]
+        self.created = []
+        self.lock = threading.Lock()
+        self.samples = {}           # op -> [latency s]
+        self.errors  = {}           # op -> count
+
+    def record(self, op: str, started: float, ok: bool):
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.samples.setdefault(op, []).append(elapsed)
+            if not ok:
+                self.errors[op] = self.errors.get(op, 0) + 1
+
+    def read(self, session: requests.Session, rng: random.Random):
+        choice = rng.random()
+        t0 = time.perf_counter()
+        if choice < 0.5 and self.ids:
+            r = session.get(f"{self.url}/posts/{rng.choice(self.ids)}")
+            self.record("read_post_html", t0, r.status_code in (200, 404))
+        elif choice < 0.8:
+            r = session.get(f"{self.url}/posts", params={"limit": 20, "fields": "id,title,tags"})
+            self.record("read_page_json", t0, r.ok)
+        else:
+            r = session.get(f"{self.url}/posts/search", params={"q": rng.choice(SEARCH_TERMS)})
+            self.record("search", t0, r.ok)
+
+    def write(self, session: requests.Session, rng: random.Random):
+        with self.lock:
+            mine = rng.choice(self.created) if self.created and rng.random() < 0.5 else None
+        t0 = time.perf_counter()
+        if mine is None:
+            r = session.post(f"{self.url}/posts", json={
+                "title": f"Load test {rng.getrandbits(32):08x}",
+                "content": "<p>" + " ".join(rng.choices(SEARCH_TERMS, k=200)) + "</p>",
+                "tags": ["loadtest"]
+            })
+            self.record("create", t0, r.ok)
+            if r.ok:
+                with self.lock:
+                    self.created.append(r.json()["id"])
+        elif rng.random() < 0.7:
+            r = session.put(f"{self.url}/posts/{mine}", json={"title": f"Load test {rng.getrandbits(32):08x}"})
+            self.record("update", t0, r.status_code in (200, 404))
+        else:
+            with self.lock:
+                if mine in self.created:
+                    self.created.remove(mine)
+            r = session.delete(f"{self.url}/posts/{mine}")
+            self.record("delete", t0, r.status_code in (204, 404))
+
+    def worker(self, n: int, deadline: float):
+        rng = random.Random(self.seed + n)
+        with requests.Session() as session:
+            while time.perf_counter() < deadline:
+                try:
+                    (self.write if rng.random() < self.write_ratio else self.read)(session, rng)
+                except requests.RequestException:
+                    # an error, not a latency sample: a ~0 ms sample would flatter p50/p99 and req/s
+                    with self.lock:
+                        self.errors["connection"] = self.errors.get("connection", 0) + 1
+
+    def cleanup(self):
+        with requests.Session() as session:
+            for post_id in self.created:
+                session.delete(f"{self.url}/posts/{post_id}")
+        self.created = []
+
+
+def summarize(op: str, samples: list, errors: int, elapsed: float) -> dict:
+    return {
+        "op": op,
+        "requests": len(samples),
+        "errors": errors,
+        "req_per_s": round(len(samples) / elapsed, 1),
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 2) if samples else 0.0
+    }
+
+
+@app.command()
+def main(
+        url: str = typer.Option("http://127.0.0.1:5000", help="Blog server URL"),
+        threads: int = typer.Option(16, help="Concurrent clients"),
+        duration: float = typer.Option(20.0, help="Seconds to run"),
+        write_ratio: float = typer.Option(0.1, help="Fraction of requests that write"),
+        seed: int = typer.Option(0, help="Random seed")
+    ):
+    """Run a mixed read/write workload against a running blog server."""
+    load = Workload(url, write_ratio, seed)
+    print(f"→ {threads} threads for {duration:.0f}s against {url} ({len(load.ids)} posts, {write_ratio:.0%} writes)")
+    started  = time.perf_counter()
+    deadline = started + duration
+    pool = [threading.Thread(target=load.worker, args=(n, deadline)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+    load.cleanup()
+
+    for op in sorted(load.samples.keys() | load.errors.keys()):
+        print(json.dumps(summarize(op, load.samples.get(op, []), load.errors.get(op, 0), elapsed)))
+    everything = [s for samples in load.samples.values() for s in samples]
+    print(json.dumps(summarize("total", everything, sum(load.errors.values()), elapsed)))
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,57 @@
+"""
+Startup timing for the mcp_files server.
+Spawns the server over stdio the way the agent host does and reports, per run:
+- handshake_s    : process spawn -> MCP initialize completed
+- first_result_s : process spawn -> first get_context result
+Run from the repo root: python -m bench.mcp_files_startup --topic "gradient descent"
+"""
+from pathlib import Path
+import asyncio, json, os, statistics, sys, time
+import typer
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+app = typer.Typer()
+
+
+async def measure_once(topic: str) -> dict:
+    params = StdioServerParameters(
+        command=sys.executable,
+        args=["-m", "servers.mcp_files"],
+        cwd=str(REPO_ROOT),
+        env=dict(os.environ)
+    )
+    t0 = time.perf_counter()
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            handshake = time.perf_counter() - t0
+            await session.call_tool("get_context", {"topics": [topic]})
+            first = time.perf_counter() - t0
+            stats = await session.call_tool("startup_stats", {})
+    return {
+        "handshake_s": round(handshake, 3),
+        "first_result_s": round(first, 3),
+        "server": json.loads(stats.content[0].text) if stats.content else None
+    }
+
+
+@app.command()
+def main(
+        topic: str = typer.Option("machine learning", help="Topic for the first get_context call"),
+        runs: int = typer.Option(3, help="Cold starts to measure")
+    ):
+    """Measure time-to-first-handshake and time-to-first-result over several cold starts."""
+    results = [asyncio.run(measure_once(topic)) for _ in range(runs)]
+    for r in results:
+        print(json.dumps(r))
+    print(json.dumps({
+        "median_handshake_s": statistics.median(r["handshake_s"] for r in results),
+        "median_first_result_s": statistics.median(r["first_result_s"] for r in results)
+    }))
+
+
+if __name__ == "__main__":
+    app()
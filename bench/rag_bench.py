@@ -0,0 +1,332 @@
+"""
+Benchmark for the indexing and retrieval path (rag/ + servers/mcp_files.retrieve).
+For each corpus size it generates a synthetic Markdown vault (seeded, so every run sees the
+same notes), then measures and reports as JSON:
+- chunking  : scan + rag.indexer.chunk_sources + ChunkStore.append (files/s, chunks/s, MB/s)
+- embedding : rag.embedder.encode over every chunk (chunks/s)
+- per index type in rag.ann.INDEX_TYPES:
+  build time, on-disk size, ann.search latency p50/p99 (one query at a time), recall@k against
+  the exact flat search, and mcp_files.retrieve latency p50/p99 (cold and cached) with
+  source_hit@k (the note a query was cut from is among the hits)
+Query texts are word windows cut from random chunks. --model hash swaps the sentence
+transformer for a feature-hashing embedder, so index/search costs can be measured at 1M chunks
+without hours of encoding (its embedding throughput is then not the model's).
+Run from the repo root:
+    python -m bench.rag_bench --chunks 1000 --chunks 100000 --model hash --out rag_bench.json
+"""
+from pathlib import Path
+import json, os, platform, random, statistics, subprocess, sys, tempfile, time, zlib
+from typing import List
+import numpy as np
+import typer
+
+REPO_ROOT       = Path(__file__).resolve().parent.parent
+WORK_DIR        = Path(tempfile.gettempdir()) / "rag_bench"
+CHUNKS_PER_NOTE = 20            # one "## section" of SECTION_WORDS words splits into one chunk
+SECTION_WORDS   = 40
+TOPICS          = 200
+HASH_DIM        = 384           # all-MiniLM-L6-v2's dimension
+
+app = typer.Typer()
+
+
+# — Synthetic vault —
+
+def make_words(rng: random.Random, n: int) -> list:
+    syllables = ["ka", "lo", "mi", "ne", "ru", "ta", "vo", "shi", "en", "ar", "tel", "dor", "ix", "pla", "qua", "zen"]
+    words = set()
+    while len(words) < n:
+        words.add("".join(rng.choices(syllables, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+class Vault:
+    """Notes on TOPICS topics; a section mixes its topic's vocabulary with common words."""
+    def __init__(self, seed: int = 0):
+        rng = random.Random(seed)
+        self.seed   = seed
+        self.common = make_words(rng, 300)
+        vocab       = make_words(rng, TOPICS * 25 + 300)[300:]
+        self.topics = [vocab[t::TOPICS][:25] for t in range(TOPICS)]
+
+    def note(self, n: int) -> str:
+        rng   = random.Random(self.seed * 1_000_003 + n)
+        topic = self.topics[n % TOPICS]
+        lines = [f"# {topic[0].title()} {topic[1]} note {n}", "", f"tags: #{topic[0]} #{topic[2]}", ""]
+        for s in range(CHUNKS_PER_NOTE):
+            words = [rng.choice(topic) if rng.random() < 0.6 else rng.choice(self.common) for _ in range(SECTION_WORDS)]
+            lines += [f"## {rng.choice(topic).title()} {s}", "", " ".join(words) + ".", ""]
+        return "\n".join(lines)
+
+    def write(self, path: Path, chunks: int) -> dict:
+        """Write enough notes for about `chunks` chunks; reused when it already exists."""
+        marker = path.with_name(path.name + ".json")       # outside the vault, or it gets indexed
+        if marker.exists():
+            return json.loads(marker.read_text())
+        started = time.perf_counter()
+        notes = max(1, -(-chunks // CHUNKS_PER_NOTE))
+        for n in range(notes):
+            folder = path / f"{n // 1000:04d}"      # keep directories small
+            if n % 1000 == 0:
+                folder.mkdir(parents=True, exist_ok=True)
+            (folder / f"note-{n:07d}.md").write_text(self.note(n), encoding="utf-8")
+        info = {"notes": notes, "generate_s": round(time.perf_counter() - started, 3)}
+        marker.write_text(json.dumps(info))
+        return info
+
+
+# — Embedders —
+
+class HashEmbedder:
+    """Signed feature hashing of lowercased words, L2-normalized; same encode() shape as rag.embedding."""
+    model_name = "hash"
+
+    def __init__(self, dim: int = HASH_DIM):
+        self.dim = dim
+
+    def encode(self, texts, batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                h = zlib.crc32(word.strip(".,#").encode())
+                out[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+
+def load_embedder(model: str):
+    if model == "hash":
+        return HashEmbedder()
+    from rag.embedding import get_embedder
+    return get_embedder(model)
+
+
+# — Measurements —
+
+def percentile(samples: list, q: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def latency(samples: list, prefix: str) -> dict:
+    return {f"{prefix}_p50_ms": round(percentile(samples, 0.50) * 1000, 3),
+            f"{prefix}_p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+            f"{prefix}_mean_ms": round(statistics.fmean(samples) * 1000, 3) if samples else 0.0}
+
+
+def disk_size(*paths: Path) -> int:
+    return sum(p.stat().st_size for p in paths if p.exists())
+
+
+def chunk_vault(vault: Path, store_path: Path, workers: int) -> dict:
+    from rag.indexer import scan, chunk_sources
+    from rag.chunk_store import ChunkStore
+    t0 = time.perf_counter()
+    files, added, _, _ = scan(vault, {})
+    t1 = time.perf_counter()
+    new = chunk_sources(added, files, workers)
+    t2 = time.perf_counter()
+    store = ChunkStore.create(store_path)
+    store.append(new)
+    t3 = time.perf_counter()
+    chunks = sum(len(t) for _, t in new)
+    mb     = sum(f["size"] for f in files.values()) / 1e6
+    return {"files": len(files), "chunks": chunks, "vault_mb": round(mb, 2),
+            "scan_s": round(t1 - t0, 3), "chunk_s": round(t2 - t1, 3), "store_s": round(t3 - t2, 3),
+            "files_per_s": round(len(files) / (t2 - t1), 1), "chunks_per_s": round(chunks / (t2 - t1), 1),
+            "mb_per_s": round(mb / (t2 - t1), 2),
+            "store_bytes": disk_size(*(store_path.with_suffix(s) for s in (".txt", ".idx", ".json")))}
+
+
+def embed_store(model, store, vec_path: Path, batch_size: int):
+    """@return - (vectors memmap, ids, stats)"""
+    from rag.embedder import encode
+    ids  = store.ids()
+    dim  = model.get_sentence_embedding_dimension()
+    vecs = np.lib.format.open_memmap(vec_path, mode="w+", dtype="float32", shape=(len(ids), dim))
+    started = time.perf_counter()
+    for start in range(0, len(ids), batch_size):
+        rows = ids[start:start + batch_size]
+        vecs[start:start + len(rows)] = encode(model, store.texts(rows), batch_size)
+    vecs.flush()
+    elapsed = time.perf_counter() - started
+    return vecs, ids, {"dim": dim, "embed_s": round(elapsed, 3), "chunks_per_s": round(len(ids) / elapsed, 1)}
+
+
+def make_queries(store, ids: np.ndarray, n: int, seed: int) -> list:
+    """Word windows cut from random chunks. @return - [(query text, source of the chunk)]"""
+    rng = random.Random(seed)
+    out = []
+    for vec_id in rng.sample(list(ids), min(n, len(ids))):
+        chunk = store.get(int(vec_id))
+        words = [w for w in chunk["text"].split() if not w.startswith("#")]
+        start = rng.randrange(max(1, len(words) - 8))
+        out.append((" ".join(words[start:start + rng.randint(4, 8)]), chunk["source"]))
+    return out
+
+
+def exact_neighbours(vecs: np.ndarray, ids: np.ndarray, q_vecs: np.ndarray, k: int, batch: int = 100_000):
+    """Exact top-k ids by inner product, streamed over the vectors."""
+    import faiss
+    best_s = np.full((len(q_vecs), k), -np.inf, dtype="float32")
+    best_i = np.full((len(q_vecs), k), -1, dtype="int64")
+    for start in range(0, len(ids), batch):
+        flat = faiss.IndexFlatIP(vecs.shape[1])
+        flat.add(np.ascontiguousarray(vecs[start:start + batch], dtype="float32"))
+        s, i = flat.search(q_vecs, k)
+        s = np.concatenate([best_s, s], axis=1)
+        i = np.concatenate([best_i, np.where(i >= 0, ids[start:start + batch][np.maximum(i, 0)], -1)], axis=1)
+        order  = np.argsort(-s, axis=1)[:, :k]
+        best_s = np.take_along_axis(s, order, axis=1)
+        best_i = np.take_along_axis(i, order, axis=1)
+    return best_i
+
+
+def bench_index(kind: str, vecs, ids, queries, q_vecs, truth, k: int, batch_size: int, model) -> dict:
+    import faiss
+    from rag import ann
+    from rag.embedder import add_stream
+    from rag.paths import INDEX_PATH
+
+    t0 = time.perf_counter()
+    index = ann.make_index(kind, vecs.shape[1], len(ids))
+    ann.train(index, vecs)
+    add_stream(index, vecs, ids, batch_size)
+    build = time.perf_counter() - t0
+    # the same atomic replace the embedder does, so mcp_files reloads it on the next call
+    tmp = INDEX_PATH.with_suffix(".tmp")
+    faiss.write_index(index, str(tmp))
+    tmp.replace(INDEX_PATH)
+    row = {"index": kind, "build_s": round(build, 3), "index_bytes": INDEX_PATH.stat().st_size}
+
+    samples, found = [], []
+    for q in q_vecs:
+        t = time.perf_counter()
+        _, i = ann.search(index, q[None, :], k)
+        samples.append(time.perf_counter() - t)
+        found.append(i[0])
+    row.update(latency(samples, "search"))
+    row[f"recall@{k}"] = round(float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])), 4)
+    del index
+
+    # mcp_files sees the new index file and reloads; pay for that outside the samples
+    files = retriever(model)
+    files.retrieve("rag bench warm up", k)
+    for label in ("retrieve", "retrieve_cached"):
+        samples, hits = [], 0
+        for text, source in queries:
+            t = time.perf_counter()
+            result = files.retrieve(text, k)
+            samples.append(time.perf_counter() - t)
+            hits += any(h["source"] == source for h in result)
+        row.update(latency(samples, label))
+    row[f"source_hit@{k}"] = round(hits / len(queries), 4)
+    return row
+
+
+_files = None
+
+def retriever(model):
+    """servers.mcp_files, warmed up with `model`; imported once the first index exists."""
+    global _files
+    if _files is None:
+        from servers import mcp_files
+        mcp_files.start_warm_up(model)
+        mcp_files.ensure_ready()
+        _files = mcp_files
+    return _files
+
+
+def run_size(target: int, args: dict, model) -> dict:
+    from rag.chunk_store import ChunkStore
+    from rag.embedder import encode
+    from rag.paths import STORE_PATH, INDEX_PATH
+
+    vault = args["work_dir"] / f"vault-{target}-{args['seed']}"
+    result = {"target_chunks": target, "vault": str(vault)}
+    result["generate"] = Vault(args["seed"]).write(vault, target)
+    emit(result, "generate")
+
+    result["chunking"] = chunk_vault(vault, STORE_PATH, args["workers"])
+    emit(result, "chunking")
+
+    store = ChunkStore(STORE_PATH)
+    vecs, ids, result["embedding"] = embed_store(model, store, INDEX_PATH.with_name("vectors.npy"), args["batch_size"])
+    emit(result, "embedding")
+
+    queries = make_queries(store, ids, args["queries"], args["seed"])
+    q_vecs  = encode(model, [q for q, _ in queries], args["batch_size"])
+    truth   = exact_neighbours(vecs, ids, q_vecs, args["k"])
+
+    result["indexes"] = []
+    for kind in args["index_types"]:
+        row = bench_index(kind, vecs, ids, queries, q_vecs, truth, args["k"], args["batch_size"], model)
+        result["indexes"].append(row)
+        emit({"target_chunks": target, **row}, "index")
+    del vecs
+    INDEX_PATH.with_name("vectors.npy").unlink(missing_ok=True)
+    return result
+
+
+def emit(row: dict, stage: str):
+    body = {k: v for k, v in row.items() if not isinstance(v, (dict, list))}
+    if stage in row and isinstance(row[stage], dict):
+        body.update(row[stage])
+    print(json.dumps({"stage": stage, **body}), flush=True)
+
+
+def environment(model: str) -> dict:
+    import faiss
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "faiss": faiss.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count(), "model": model,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+
+
+@app.command()
+def main(
+        chunks: List[int] = typer.Option([1000], help="Corpus sizes in chunks (repeat the option), e.g. 1000 to 1000000"),
+        index_types: List[str] = typer.Option(["flat", "ivf_flat", "ivf_pq", "hnsw"], "--index-type", help="Index types to build"),
+        model: str = typer.Option("sentence-transformers/all-MiniLM-L6-v2", help="Embedding model, or 'hash'"),
+        queries: int = typer.Option(200, help="Queries per index type"),
+        k: int = typer.Option(5, help="Neighbours per query"),
+        batch_size: int = typer.Option(256, help="Chunks encoded/added per batch"),
+        workers: int = typer.Option(os.cpu_count() or 1, help="Chunking processes"),
+        seed: int = typer.Option(0, help="Vault and query seed"),
+        work_dir: Path = typer.Option(WORK_DIR, help="Vaults, chunk store and index live here"),
+        out: Path = typer.Option(None, help="Also write the full results to this JSON file")
+    ):
+    """Generate synthetic vaults and benchmark chunking, embedding, index builds and retrieval."""
+    from rag.ann import INDEX_TYPES
+    unknown = set(index_types) - set(INDEX_TYPES)
+    if unknown:
+        raise typer.BadParameter(f"Unknown index type(s) {sorted(unknown)}, expected {INDEX_TYPES}")
+    # mcp_files and rag read their paths at import time
+    live = work_dir / "live"
+    live.mkdir(parents=True, exist_ok=True)
+    os.environ["RAG_STORE_PATH"] = str(live / "docs_chunks")
+    os.environ["RAG_INDEX_PATH"] = str(live / "docs_index.faiss")
+    os.environ.setdefault("RAG_CACHE_SIZE", str(max(1024, 2 * queries)))
+
+    embedder = load_embedder(model)
+    args = {"work_dir": work_dir, "seed": seed, "workers": workers, "batch_size": batch_size,
+            "queries": queries, "k": k, "index_types": index_types}
+    report = {"environment": environment(model), "config": {**args, "work_dir": str(work_dir)},
+              "sizes": [run_size(target, args, embedder) for target in chunks]}
+
+    if out:
+        out.write_text(json.dumps(report, indent=1))
+        print(f"→ Wrote {out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,44 @@
+# render.py
+"""
+Markdown -> HTML for blog posts.
+Posts store their Markdown source next to the rendered HTML plus a content hash over
+(renderer signature, source). A write only renders when the hash changes, and
+`flask --app blog.server rerender` re-renders every post whose hash predates the
+current EXTRAS / markdown2 version.
+"""
+import hashlib
+import re
+import markdown2
+
+EXTRAS = [
+    "fenced-code-blocks",
+    "code-friendly",
+    "highlightjs-lang",
+    "tables",
+    "strike",
+    "cuddled-lists",
+    "break-on-newline"
+]
+
+# changes whenever the output for the same source could change
+SIGNATURE = f"markdown2={markdown2.__version__};extras={','.join(sorted(EXTRAS))}"
+
+
+def normalize(markdown: str) -> str:
+    """
+    Agents often send literal "\\n" sequences instead of newlines.
+    Source with no real newline at all was escaped wholesale and is unescaped wholesale;
+    otherwise only sequences that end a line (or start a run of them) become newlines,
+    leaving ones inside code such as printf("\\n") alone.
+    """
+    if "\n" not in markdown:
+        return markdown.replace("\\n", "\n")
+    return re.sub(r"\\n(?=\s|$|\\n)", "\n", markdown)
+
+
+def content_hash(markdown: str) -> str:
+    return hashlib.sha256(f"{SIGNATURE}\0{markdown}".encode("utf-8")).hexdigest()
+
+
+def render(markdown: str) -> str:
+    return markdown2.markdown(markdown, extras=EXTRAS)
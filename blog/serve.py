@@ -0,0 +1,44 @@
+# serve.py
+"""
+Production entry point for the blog.
+Runs blog.server:app under uvicorn with several worker processes, each wrapping the Flask
+app in a2wsgi's WSGIMiddleware (ASGI): requests and responses stream, and every worker runs
+the WSGI calls on its own pool of THREADS threads.
+Startup work (server.init_db: create_all, FTS backfill, tag migration) runs once here
+before the workers are spawned; the workers only import the app, so they start against an
+up-to-date database without racing each other through the migrations.
+Run from the repo root: python -m blog.serve --workers 4
+"""
+import os
+import typer
+import uvicorn
+
+THREADS = int(os.environ.get("BLOG_THREADS", 16))       # WSGI threads per worker
+
+app = typer.Typer()
+
+
+def asgi_app():
+    """uvicorn factory, called in each worker."""
+    from a2wsgi import WSGIMiddleware
+    from blog.server import app as flask_app
+    return WSGIMiddleware(flask_app, workers=THREADS)
+
+
+@app.command()
+def main(
+        host: str = typer.Option("127.0.0.1", help="Bind address"),
+        port: int = typer.Option(5000, help="Port; the MCP blog server expects 5000"),
+        workers: int = typer.Option(min(4, os.cpu_count() or 1), help="Worker processes"),
+        log_level: str = typer.Option("warning", help="uvicorn log level")
+    ):
+    """Serve the blog with multiple workers."""
+    from blog.server import init_db
+    init_db()
+    print(f"→ Serving blog on http://{host}:{port} with {workers} workers")
+    uvicorn.run("blog.serve:asgi_app", factory=True, host=host, port=port, workers=workers,
+                interface="asgi3", log_level=log_level)
+
+
+if __name__ == "__main__":
+    app()
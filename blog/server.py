@@ -1,50 +1,493 @@
-from flask import Flask, request, jsonify, abort, render_template
+from flask import Flask, request, jsonify, abort, render_template, make_response, Response, g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
+import click
+from sqlalchemy import event, func, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import load_only, object_session, selectinload
+from collections import OrderedDict
+from datetime import datetime, timezone
+import functools
 import os
+import re
+import sqlite3
+import threading
+import time
 
-app = Flask(__name__, instance_relative_config=True)
+try:
+    from blog import render
+except ImportError:     # run as a script from blog/
+    import render
+
+# explicit, so the database is the same whether this runs as server.py or is imported as blog.server
+INSTANCE_PATH   = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance")
+BUSY_TIMEOUT_MS = int(os.environ.get("BLOG_BUSY_TIMEOUT_MS", 5000))
+
+app = Flask(__name__, instance_path=INSTANCE_PATH, instance_relative_config=True)
 
 # ensure instance folder is created
 os.makedirs(app.instance_path, exist_ok=True)
 db_path = os.path.join(app.instance_path, 'blog.db')
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    # one connection per request thread; SQLite connections are cheap but not free to open
+    "pool_size": int(os.environ.get("BLOG_POOL_SIZE", 8)),
+    "max_overflow": int(os.environ.get("BLOG_POOL_OVERFLOW", 8)),
+    "pool_timeout": 30,
+    "connect_args": {"timeout": BUSY_TIMEOUT_MS / 1000, "check_same_thread": False}
+}
+
+@event.listens_for(Engine, "connect")
+def sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Per-connection SQLite settings.
+    WAL lets readers run alongside the single writer, busy_timeout makes writers queue instead of
+    failing with "database is locked", and synchronous=NORMAL is durable under WAL except for
+    the last transactions on power loss.
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA cache_size=-16000")      # 16 MB page cache
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
 
 db = SQLAlchemy(app)
 
+POST_FIELDS   = ("id", "title", "content", "markdown", "tags")
+DEFAULT_FIELDS = ("id", "title", "content", "tags")
+MAX_PAGE_SIZE = 1000
+MAX_BULK      = 1000
+SEARCH_WEIGHTS = (10.0, 1.0, 5.0)     # bm25 weight of title, content, tags
+PAGE_CACHE_BYTES = int(os.environ.get("BLOG_PAGE_CACHE_MB", 32)) * 1024 * 1024
+VERSION_PATH  = os.path.join(app.instance_path, "cache_version")
+CACHED_HEADERS = ("Content-Type", "X-Next-After-Id")
+
 # --- Models ---
+post_tags = db.Table(
+    "post_tags",
+    db.Column("post_id", db.Integer, db.ForeignKey("post.id", ondelete="CASCADE"), primary_key=True),
+    db.Column("tag_id", db.Integer, db.ForeignKey("tag.id", ondelete="CASCADE"), primary_key=True),
+    # the primary key serves post -> tags; this serves tag -> posts
+    db.Index("ix_post_tags_tag_post", "tag_id", "post_id")
+)
+
+class Tag(db.Model):
+    id   = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), nullable=False, unique=True, index=True)
+
 class Post(db.Model):
     id      = db.Column(db.Integer, primary_key=True)
     title   = db.Column(db.String(200), nullable=False)
-    content = db.Column(db.Text, nullable=False)
-    tags    = db.Column(db.String(200), nullable=True)
+    content = db.Column(db.Text, nullable=False)          # rendered HTML
+    markdown = db.Column(db.Text, nullable=True)          # source; NULL for posts written as raw HTML
+    content_hash = db.Column(db.String(64), nullable=True)   # render.content_hash of markdown
+    # legacy comma-separated tags; moved into post_tags by migrate_tags() and left NULL
+    legacy_tags = db.Column("tags", db.String(200), nullable=True)
+    tags    = db.relationship(Tag, secondary=post_tags, order_by=Tag.name, backref=db.backref("posts", lazy="dynamic"))
+
+    def to_dict(self, fields=DEFAULT_FIELDS):
+        # only touch requested attributes, so projected (load_only) rows never lazy-load
+        data = {f: getattr(self, f) for f in fields if f != "tags"}
+        if "tags" in fields:
+            data["tags"] = [t.name for t in self.tags]
+        return {f: data[f] for f in fields}
+
+def normalize_tags(tags):
+    """Accept a list/tuple or a comma string; lowercase, stripped, de-duplicated, in order."""
+    if tags is None:
+        return []
+    if not isinstance(tags, (list, tuple)):
+        tags = str(tags).split(",")
+    return list(dict.fromkeys(t.strip().lower() for t in tags if str(t).strip()))
+
+def get_tags(names):
+    """Tag rows for the given names, creating the missing ones."""
+    names = normalize_tags(names)
+    if not names:
+        return []
+    # INSERT OR IGNORE, so concurrent writers creating the same new tag don't collide
+    db.session.execute(sqlite_insert(Tag).values([{"name": n} for n in names]).on_conflict_do_nothing())
+    found = {t.name: t for t in Tag.query.filter(Tag.name.in_(names))}
+    return [found[n] for n in names]
+
+# --- Content version ---
+# One counter for all content, kept in a file in the instance dir so every worker process
+# sees a write made by any other. It is bumped after a commit that changed posts; pages
+# rendered under an older version are stale. Reading it costs a small file read, not a query.
+def read_version():
+    try:
+        with open(VERSION_PATH, "r") as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+def bump_version():
+    # wall-clock ns so concurrent bumps from different workers still differ and only move forward
+    version = max(read_version() + 1, time.time_ns())
+    tmp = f"{VERSION_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(str(version))
+    os.replace(tmp, VERSION_PATH)
+    return version
+
+def mark_changed(post):
+    session = object_session(post)
+    if session is not None:
+        session.info["content_changed"] = True
+
+@event.listens_for(db.session, "after_commit")
+def content_committed(session):
+    if session.info.pop("content_changed", False):
+        bump_version()
+
+@event.listens_for(db.session, "after_rollback")
+def content_rolled_back(session):
+    session.info.pop("content_changed", None)
+
+# --- Full-text index ---
+# post_fts mirrors title/content/tags (rowid = post id) and is kept in sync by mapper events,
+# so every write path, including future ones, updates it inside the same transaction.
+def plain_text(html):
+    return re.sub(r"<[^>]+>", " ", html or "")
+
+def fts_row(post):
+    return {
+        "id": post.id,
+        "title": post.title,
+        "content": plain_text(post.content),
+        "tags": " ".join(t.name for t in post.tags)
+    }
+
+@event.listens_for(Post, "after_insert")
+@event.listens_for(Post, "after_update")
+def index_post(mapper, connection, post):
+    mark_changed(post)
+    connection.execute(text("DELETE FROM post_fts WHERE rowid = :id"), {"id": post.id})
+    connection.execute(text("INSERT INTO post_fts(rowid, title, content, tags) VALUES (:id, :title, :content, :tags)"),
+                       fts_row(post))
+
+@event.listens_for(Post, "after_delete")
+def unindex_post(mapper, connection, post):
+    mark_changed(post)
+    connection.execute(text("DELETE FROM post_fts WHERE rowid = :id"), {"id": post.id})
+
+def sync_search_index():
+    """Create post_fts and backfill it when it has drifted from the post table."""
+    db.session.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS post_fts USING fts5(title, content, tags, tokenize='porter unicode61')"))
+    indexed = db.session.execute(text("SELECT count(*) FROM post_fts")).scalar()
+    if indexed != Post.query.count():
+        db.session.execute(text("DELETE FROM post_fts"))
+        for post in Post.query.all():
+            db.session.execute(text("INSERT INTO post_fts(rowid, title, content, tags) VALUES (:id, :title, :content, :tags)"),
+                               fts_row(post))
+    db.session.commit()
+
+def migrate_tags():
+    """Move legacy comma-separated Post.tags strings into the tag tables (idempotent)."""
+    legacy = Post.query.filter(Post.legacy_tags.isnot(None)).all()
+    for post in legacy:
+        post.tags = get_tags(normalize_tags(post.legacy_tags) + [t.name for t in post.tags])
+        post.legacy_tags = None
+    if legacy:
+        db.session.commit()
+        print(f"→ Migrated tags of {len(legacy)} posts")
+
+def add_missing_columns():
+    """create_all() won't alter existing tables; add columns introduced since the file was created."""
+    existing = {row[1] for row in db.session.execute(text("PRAGMA table_info(post)"))}
+    for column in ("markdown", "content_hash"):
+        if column not in existing:
+            db.session.execute(text(f"ALTER TABLE post ADD COLUMN {column} TEXT"))
+    db.session.commit()
+
+def init_db():
+    """
+    Create tables if they don’t exist, then run the migrations and backfills.
+    Called once by the launching process (blog.serve, __main__, `flask init-db`), never on import,
+    so uvicorn workers don't race each other through ALTER TABLE and the backfills.
+    """
+    with app.app_context():
+        db.create_all()
+        add_missing_columns()
+        sync_search_index()
+        migrate_tags()
+        if not os.path.exists(VERSION_PATH):
+            bump_version()
+
+@app.cli.command("init-db")
+def init_db_command():
+    """Create/migrate the database."""
+    init_db()
+
+# --- Page cache ---
+class PageCache:
+    """LRU of rendered responses, bounded by total body size, tagged with the content version."""
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()     # key -> (version, body, headers)
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, body, headers):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self._entries[key] = (version, body, headers)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted[1])
+
+page_cache = PageCache(PAGE_CACHE_BYTES)
+
+def http_date(version):
+    return datetime.fromtimestamp(version // 1_000_000_000, tz=timezone.utc)
+
+def cached(view):
+    """
+    Conditional GETs and page caching for read routes.
+    Validators come from the content version: ETag "<version>-<html|json>", Last-Modified
+    from its timestamp. A matching If-None-Match (or If-Modified-Since) gets a 304 before
+    any query runs; otherwise a page rendered under the current version is served from
+    page_cache, and only a miss runs the view.
+    Last-Modified only has whole seconds, so it is sent and If-Modified-Since honoured only
+    once the version is a second old: a later write can then no longer share its second.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        version  = read_version()
+        kind     = "json" if wants_json() else "html"
+        etag     = f"{version}-{kind}"
+        modified = http_date(version)
+        settled  = time.time_ns() - version >= 1_000_000_000
+
+        def validators(response):
+            response.set_etag(etag)
+            if settled:
+                response.last_modified = modified
+            response.headers["Cache-Control"] = "no-cache"     # always revalidate, it's cheap
+            response.vary.add("Accept")
+            return response
+
+        if request.if_none_match:
+            not_modified = not request.if_none_match.star_tag and request.if_none_match.contains(etag)
+        else:
+            not_modified = settled and request.if_modified_since is not None and modified <= request.if_modified_since
+        if not_modified:
+            return validators(Response(status=304))
 
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "title": self.title,
-            "content": self.content,
-            "tags": [t.strip() for t in self.tags.split(",")] if self.tags else []
-        }
+        key   = (request.full_path, kind)
+        entry = page_cache.get(key, version)
+        if entry is not None:
+            return validators(Response(entry[1], headers=entry[2]))
 
-# Create tables if they don’t exist
-with app.app_context():
-    db.create_all()
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200:
+            return response
+        page_cache.put(key, version, response.get_data(),
+                       [(h, response.headers[h]) for h in CACHED_HEADERS if h in response.headers])
+        return validators(response)
+    return wrapper
+
+# --- Write helpers ---
+# Posts are written either as "markdown" (rendered here, source kept) or as raw HTML "content".
+def create_error(data):
+    if not data.get("title") or not (data.get("markdown") or data.get("content")):
+        return "title and one of markdown or content are required."
+
+def update_error(data):
+    if all(data.get(f) is None for f in ("title", "markdown", "content", "tags")):
+        return "At least one of title, markdown, content, or tags must be provided."
+
+def set_markdown(post, markdown):
+    """Store the source and render it, unless the same source was already rendered the same way."""
+    markdown = render.normalize(markdown)
+    digest   = render.content_hash(markdown)
+    if digest == post.content_hash:
+        return False
+    started = time.perf_counter()
+    post.markdown, post.content, post.content_hash = markdown, render.render(markdown), digest
+    add_timing("render", time.perf_counter() - started)
+    return True
+
+def add_timing(stage, seconds):
+    """Report a stage of this request in its Server-Timing header (mcp_blog records it in its traces)."""
+    if has_request_context():
+        timings = g.setdefault("timings", {})
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+@app.after_request
+def server_timing(response):
+    if "timings" in g:
+        response.headers["Server-Timing"] = ", ".join(f"{k};dur={v * 1000:.2f}" for k, v in g.timings.items())
+    return response
+
+def set_html(post, html):
+    post.markdown, post.content, post.content_hash = None, html, None
+
+def new_post(data):
+    post = Post(title=data["title"], tags=get_tags(data.get("tags", [])))
+    if data.get("markdown"):
+        set_markdown(post, data["markdown"])
+    else:
+        set_html(post, data["content"])
+    return post
+
+def apply_update(post, data):
+    if data.get("title") is not None:
+        post.title = data["title"]
+    if data.get("markdown") is not None:
+        set_markdown(post, data["markdown"])
+    elif data.get("content") is not None:
+        set_html(post, data["content"])
+    if data.get("tags") is not None:
+        post.tags = get_tags(data["tags"])
+
+# --- Listing helpers ---
+def requested_fields():
+    """?fields=id,title,... projection; defaults to everything but the markdown source."""
+    raw = request.args.get("fields")
+    if not raw:
+        return DEFAULT_FIELDS
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    unknown = set(fields) - set(POST_FIELDS)
+    if unknown or not fields:
+        abort(400, f"Unknown field(s) {sorted(unknown)}; choose from {', '.join(POST_FIELDS)}.")
+    return fields
+
+def project(query, fields):
+    """Only load the columns a response will serialize; tags come in one extra IN query."""
+    query = query.options(load_only(Post.id, *(getattr(Post, f) for f in fields if f not in ("id", "tags"))))
+    if "tags" in fields:
+        query = query.options(selectinload(Post.tags))
+    return query
+
+def tagged(query, names):
+    """Keep posts carrying every one of the given tags (indexed lookups through post_tags)."""
+    for name in normalize_tags(names):
+        query = query.filter(Post.id.in_(
+            select(post_tags.c.post_id).join(Tag, Tag.id == post_tags.c.tag_id).where(Tag.name == name)))
+    return query
+
+def post_listing(query):
+    """
+    Apply keyset pagination, ordering and projection to a Post query.
+    ?limit=N        page size (max MAX_PAGE_SIZE); omitted returns everything
+    ?after_id=ID    continue after this id, in the requested order
+    ?order=asc|desc by id (creation order)
+    ?fields=a,b     subset of id,title,content,markdown,tags
+    ?tag=t          only posts tagged t; repeat to require several tags
+    The next page's after_id is sent in the X-Next-After-Id header when the page is full.
+    """
+    order    = request.args.get("order", "asc")
+    limit    = request.args.get("limit", type=int)
+    after_id = request.args.get("after_id", type=int)
+    fields   = requested_fields()
+    if order not in ("asc", "desc"):
+        abort(400, "order must be 'asc' or 'desc'.")
+
+    query = tagged(query, request.args.getlist("tag"))
+    if after_id is not None:
+        query = query.filter(Post.id > after_id if order == "asc" else Post.id < after_id)
+    query = query.order_by(Post.id.asc() if order == "asc" else Post.id.desc())
+    if limit is not None:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        query = query.limit(limit)
+
+    posts    = project(query, fields).all()
+    response = jsonify([p.to_dict(fields) for p in posts])
+    if limit is not None and len(posts) == limit:
+        response.headers["X-Next-After-Id"] = str(posts[-1].id)
+    return response
+
+def wants_json():
+    return request.accept_mimetypes.best_match(["text/html", "application/json"]) == "application/json"
 
 # --- Routes ---
 @app.route('/')
+@cached
 def home():
     posts = [p.to_dict() for p in Post.query.order_by(Post.id.desc()).limit(5).all()]
     return render_template('index.html', posts=posts)
 
 @app.route("/posts", methods=["GET"])
+@cached
 def list_posts():
-    posts = Post.query.all()
-    return jsonify([p.to_dict() for p in posts])
+    return post_listing(Post.query)
+
+@app.route("/posts/latest", methods=["GET"])
+@cached
+def latest_post():
+    fields = requested_fields()
+    post = project(Post.query.order_by(Post.id.desc()), fields).first_or_404()
+    return jsonify(post.to_dict(fields))
+
+@app.route("/tags", methods=["GET"])
+@cached
+def list_tags():
+    """Every tag in use with its post count, most used first."""
+    rows = (db.session.query(Tag.name, func.count(post_tags.c.post_id))
+            .join(post_tags, post_tags.c.tag_id == Tag.id)
+            .group_by(Tag.id)
+            .order_by(func.count(post_tags.c.post_id).desc(), Tag.name)
+            .all())
+    return jsonify([{"name": name, "count": count} for name, count in rows])
+
+@app.route("/tags/<tag>/posts", methods=["GET"])
+@cached
+def list_tag_posts(tag):
+    return post_listing(tagged(Post.query, [tag]))
+
+@app.route("/posts/search", methods=["GET"])
+@cached
+def search_posts():
+    """
+    Ranked full-text search over title, content and tags.
+    ?q=words  every word must match (as a prefix)
+    ?limit=N  max results, default 20
+    """
+    terms = re.findall(r"\w+", request.args.get("q", ""))
+    if not terms:
+        abort(400, "q must contain at least one word.")
+    limit = max(1, min(request.args.get("limit", 20, type=int), MAX_PAGE_SIZE))
+    match = " ".join(f'"{t}"*' for t in terms)
+    rows = db.session.execute(text(
+        "SELECT rowid, title, snippet(post_fts, 1, '[', ']', '…', 12), "
+        f"bm25(post_fts, {', '.join(map(str, SEARCH_WEIGHTS))}) AS rank "
+        "FROM post_fts WHERE post_fts MATCH :match ORDER BY rank LIMIT :limit"
+    ), {"match": match, "limit": limit})
+    return jsonify([
+        {"id": r[0], "title": r[1], "snippet": r[2], "score": round(-r[3], 4)} for r in rows
+    ])
 
 @app.route("/posts/<int:post_id>", methods=["GET"])
+@cached
 def get_post(post_id):
     post = Post.query.get_or_404(post_id)
+    # API clients ask for JSON; browsers get the rendered page
+    if wants_json():
+        return jsonify(post.to_dict(requested_fields()))
     return render_template('post.html', post=post)
 
 
@@ -53,25 +496,12 @@ def update_post(post_id):
     post = Post.query.get_or_404(post_id)
     data = request.get_json() or {}
 
-    title = data.get("title")
-    content = data.get("content")
-    tags = data.get("tags")
-
     # If nothing to update, return 400
-    if title is None and content is None and tags is None:
-        abort(400, "At least one of title, content, or tags must be provided.")
-
-    if title is not None:
-        post.title = title
-    if content is not None:
-        post.content = content
-    if tags is not None:
-        # Normalize tags: accept list/tuple or comma string
-        if isinstance(tags, (list, tuple)):
-            post.tags = ",".join(tags)
-        else:
-            post.tags = str(tags)
+    error = update_error(data)
+    if error:
+        abort(400, error)
 
+    apply_update(post, data)
     db.session.commit()
     return jsonify(post.to_dict()), 200
 
@@ -85,21 +515,119 @@ def delete_post(post_id):
 @app.route("/posts", methods=["POST"])
 def create_post():
     data = request.get_json() or {}
-    title   = data.get("title")
-    content = data.get("content")
-    tags    = data.get("tags", [])
+    error = create_error(data)
+    if error:
+        abort(400, error)
 
-    if not title or not content:
-        abort(400, "Both title and content are required.")
-
-    # Store tags as comma-separated string
-    tags_str = ",".join(tags) if isinstance(tags, (list, tuple)) else str(tags)
-
-    post = Post(title=title, content=content, tags=tags_str)
+    post = new_post(data)
     db.session.add(post)
     db.session.commit()
 
     return jsonify(post.to_dict()), 201
 
+# --- Bulk ---
+# Each bulk call is one request and one transaction. Items are validated up front and
+# reported individually ({"index", "id", "status", "error"?}); valid items are applied
+# and committed together, so a bad item never blocks the good ones.
+def bulk_items(key):
+    data  = request.get_json(silent=True) or {}
+    items = data.get(key)
+    if not isinstance(items, list) or not items:
+        abort(400, f"Expected a non-empty list under '{key}'.")
+    if len(items) > MAX_BULK:
+        abort(400, f"At most {MAX_BULK} items per call.")
+    return items
+
+def bulk_response(results, **counts):
+    return jsonify({**counts, "results": results})
+
+@app.route("/posts/bulk", methods=["POST"])
+def bulk_create_posts():
+    """{"posts": [{"title", "markdown" | "content", "tags"}, ...]}"""
+    results, created = [], []
+    for index, data in enumerate(bulk_items("posts")):
+        error = create_error(data) if isinstance(data, dict) else "Each item must be an object."
+        if error:
+            results.append({"index": index, "id": None, "status": 400, "error": error})
+            continue
+        post = new_post(data)
+        db.session.add(post)
+        created.append((index, post))
+        results.append(None)
+    db.session.commit()
+    for index, post in created:
+        results[index] = {"index": index, "id": post.id, "status": 201}
+    return bulk_response(results, created=len(created))
+
+@app.route("/posts/bulk", methods=["PATCH"])
+def bulk_update_posts():
+    """{"posts": [{"id", "title"?, "markdown"? | "content"?, "tags"?}, ...]}"""
+    items = bulk_items("posts")
+    ids   = [d.get("id") for d in items if isinstance(d, dict) and isinstance(d.get("id"), int)]
+    posts = {p.id: p for p in Post.query.filter(Post.id.in_(ids))} if ids else {}
+    results = []
+    for index, data in enumerate(items):
+        post_id = data.get("id") if isinstance(data, dict) else None
+        error   = update_error(data) if isinstance(data, dict) else "Each item must be an object."
+        if error is None and not isinstance(post_id, int):
+            error = "id must be an integer."
+        if error:
+            results.append({"index": index, "id": post_id, "status": 400, "error": error})
+        elif post_id not in posts:
+            results.append({"index": index, "id": post_id, "status": 404, "error": "Post not found."})
+        else:
+            apply_update(posts[post_id], data)
+            results.append({"index": index, "id": post_id, "status": 200})
+    db.session.commit()
+    return bulk_response(results, updated=sum(r["status"] == 200 for r in results))
+
+@app.route("/posts/bulk", methods=["DELETE"])
+def bulk_delete_posts():
+    """{"ids": [...]} or {"start": a, "end": b} (inclusive id range of at most MAX_BULK ids)"""
+    data = request.get_json(silent=True) or {}
+    if "ids" in data:
+        ids = bulk_items("ids")
+        if not all(isinstance(i, int) for i in ids):
+            abort(400, "ids must be integers.")
+        posts = Post.query.filter(Post.id.in_(ids)).all()
+    elif isinstance(data.get("start"), int) and isinstance(data.get("end"), int):
+        if data["end"] - data["start"] + 1 > MAX_BULK:
+            abort(400, f"At most {MAX_BULK} ids per range; split it into several calls.")
+        posts = Post.query.filter(Post.id.between(data["start"], data["end"])).order_by(Post.id).all()
+        ids   = [p.id for p in posts]
+    else:
+        abort(400, "Provide 'ids' or integer 'start' and 'end'.")
+    # deleting through the ORM keeps post_tags, the FTS index and the cache version in step
+    for post in posts:
+        db.session.delete(post)
+    db.session.commit()
+    found   = {p.id for p in posts}
+    results = [{"index": index, "id": post_id, "status": 204 if post_id in found else 404}
+               for index, post_id in enumerate(ids)]
+    return bulk_response(results, deleted=len(found))
+
+# --- CLI ---
+@app.cli.command("rerender")
+@click.option("--all", "everything", is_flag=True, help="Re-render every Markdown post, not only stale ones.")
+@click.option("--batch", default=200, help="Posts per commit.")
+def rerender(everything, batch):
+    """Re-render posts whose HTML was produced by an older renderer configuration."""
+    rendered = last_id = 0
+    while True:
+        posts = (Post.query.filter(Post.markdown.isnot(None), Post.id > last_id)
+                 .order_by(Post.id).limit(batch).all())
+        if not posts:
+            break
+        for post in posts:
+            if everything:
+                post.content_hash = None
+            rendered += set_markdown(post, post.markdown)
+        last_id = posts[-1].id
+        db.session.commit()
+        db.session.expunge_all()
+    print(f"→ Re-rendered {rendered} posts")
+
 if __name__ == "__main__":
+    # development server; for production use `python -m blog.serve`
+    init_db()
     app.run(debug=True)
@@ -0,0 +1,145 @@
+# client.py
+"""
+Process-wide Gmail client.
+- credentials are loaded once and refreshed by a background thread before they expire
+- the discovery document is read once from a local cache (falling back to the copy
+  bundled with google-api-python-client, then to the network) and never re-fetched
+- httplib2 is not thread-safe, so each thread gets its own service + AuthorizedHttp,
+  built from the cached document (cheap) and sharing the one credentials object
+Use get_client().service() wherever a Gmail service was built before.
+Set GMAIL_API_ROOT (e.g. http://127.0.0.1:8099/ for gmail.fake_api) to talk to another
+endpoint without OAuth.
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+import json, os, pickle, sys, threading, time
+import httplib2
+from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build_from_document, DISCOVERY_URI
+from googleapiclient.discovery_cache import get_static_doc
+from .oauth import get_gmail_credentials, TOKEN_PATH
+
+DISCOVERY_PATH = Path(__file__).resolve().parent / "gmail.v1.discovery.json"
+REFRESH_MARGIN = int(os.environ.get("GMAIL_REFRESH_MARGIN", 300))     # seconds before expiry
+HTTP_TIMEOUT   = float(os.environ.get("GMAIL_HTTP_TIMEOUT", 30))
+API_ROOT       = os.environ.get("GMAIL_API_ROOT")
+
+
+def _log(msg: str):
+    # stdout carries the MCP stdio transport
+    print(msg, file=sys.stderr, flush=True)
+
+
+def load_discovery_document(path: Path = DISCOVERY_PATH) -> str:
+    """The Gmail v1 discovery document, cached at `path` after the first lookup."""
+    if path.exists():
+        return path.read_text(encoding="utf-8")
+    document = get_static_doc("gmail", "v1")
+    if document is None:
+        response, content = httplib2.Http(timeout=HTTP_TIMEOUT).request(
+            DISCOVERY_URI.format(api="gmail", apiVersion="v1"))
+        if response.status != 200:
+            raise RuntimeError(f"Could not fetch the Gmail discovery document ({response.status})")
+        document = content.decode("utf-8")
+    json.loads(document)        # don't cache something unusable
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(document, encoding="utf-8")
+    tmp.replace(path)
+    return document
+
+
+class GmailClient:
+    def __init__(self, refresh_margin: int = REFRESH_MARGIN, api_root: str | None = API_ROOT):
+        """@param: api_root - OPTIONAL; serve requests from this root URL, unauthenticated"""
+        self.refresh_margin = refresh_margin
+        self.api_root = api_root
+        self._lock  = threading.Lock()
+        self._local = threading.local()
+        self._creds = None
+        self._document = None
+        self._refresher = None
+
+    def credentials(self):
+        with self._lock:
+            if self._creds is None:
+                self._creds = get_gmail_credentials()
+                self._refresher = threading.Thread(target=self._refresh_loop, name="gmail-token-refresh", daemon=True)
+                self._refresher.start()
+            return self._creds
+
+    def document(self) -> str:
+        with self._lock:
+            if self._document is None:
+                self._document = load_discovery_document()
+                if self.api_root:
+                    # rootUrl also drives the batch endpoint, which client_options can't override
+                    doc = json.loads(self._document)
+                    doc["rootUrl"] = self.api_root
+                    self._document = json.dumps(doc)
+            return self._document
+
+    def service(self):
+        """This thread's Gmail service; built on first use in each thread."""
+        service = getattr(self._local, "service", None)
+        if service is None:
+            http = httplib2.Http(timeout=HTTP_TIMEOUT)
+            if not self.api_root:
+                http = AuthorizedHttp(self.credentials(), http=http)
+            service = build_from_document(self.document(), http=http)
+            self._local.service = service
+        return service
+
+    def warm_up(self):
+        """Load credentials and the discovery document ahead of the first tool call."""
+        started = time.perf_counter()
+        self.service()
+        _log(f"→ Gmail client ready in {time.perf_counter() - started:.2f}s")
+
+    # — Token refresh —
+
+    def _seconds_left(self) -> float | None:
+        if self._creds.expiry is None:
+            return None
+        # google-auth keeps expiry as naive UTC
+        return (self._creds.expiry - datetime.now(timezone.utc).replace(tzinfo=None)).total_seconds()
+
+    def refresh(self):
+        with self._lock:
+            self._creds.refresh(Request())
+            save_credentials(self._creds)
+        _log(f"→ Gmail token refreshed, valid until {self._creds.expiry} UTC")
+
+    def _refresh_loop(self):
+        while True:
+            left = self._seconds_left()
+            if left is None or not self._creds.refresh_token:
+                return
+            wait = left - self.refresh_margin
+            if wait > 0:
+                time.sleep(min(wait, 3600))
+                continue
+            try:
+                self.refresh()
+            except Exception as e:
+                _log(f"→ Gmail token refresh failed: {e}; retrying in 60s")
+                time.sleep(60)
+
+
+def save_credentials(creds, path: str = TOKEN_PATH):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(creds, f)
+    os.replace(tmp, path)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> GmailClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GmailClient()
+        return _client
@@ -0,0 +1,309 @@
+# fake_api.py
+"""
+Local stand-in for the slice of the Gmail v1 REST API this repo uses.
+An in-memory mailbox behind a real HTTP server, so the real googleapiclient service
+(including batch requests) runs against it unchanged:
+- users.getProfile, users.messages.list (q, pageToken, includeSpamTrash), users.messages.get
+  (minimal / metadata + metadataHeaders / full), users.messages.send
+- users.history.list with startHistoryId; history older than the retained window is a 404
+- fail_gets(ids) makes messages.get answer 429 rateLimitExceeded, to exercise retries
+- POST /batch (multipart/mixed, one sub-request per part)
+Every HTTP request can be delayed by `latency` seconds to mimic a round trip, and is counted.
+    fake = FakeGmail(latency=0.05).start()
+    fake.add_message("ada@example.com", "Hello", "Body text")
+    service = fake.client().service()
+Or run it standalone and point the MCP server at it:
+    python -m gmail.fake_api --port 8099 --messages 200
+    GMAIL_API_ROOT=http://127.0.0.1:8099/ python -m servers.mcp_email
+"""
+from email.parser import Parser
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+import base64, json, random, re, threading, time
+from datetime import datetime, timezone
+import typer
+
+app = typer.Typer()
+
+PREFIX = "/gmail/v1/users/me"
+HIDDEN_LABELS = {"SPAM", "TRASH"}
+WORDS  = ("meeting", "invoice", "report", "lunch", "review", "deadline", "travel", "update", "draft", "budget")
+
+
+class FakeGmail:
+    def __init__(self, latency: float = 0.0, address: str = "me@example.com"):
+        self.latency  = latency
+        self.address  = address
+        self.messages = {}          # id -> message
+        self.history  = []          # [{"id", ...change}], ascending
+        self.history_id   = 1000
+        self.oldest_history = self.history_id   # history.list below this is expired
+        self.failures = {}          # message id -> messages.get calls still to fail with 429
+        self.requests = 0           # HTTP requests served (a batch counts once)
+        self.calls    = 0           # API calls served (each batch part counts)
+        self._next_id = 1
+        self._lock    = threading.RLock()
+        self._server  = None
+
+    # — Mailbox (test side) —
+
+    def _record(self, **change) -> int:
+        self.history_id += 1
+        self.history.append({"id": self.history_id, **change})
+        return self.history_id
+
+    def add_message(self, sender: str, subject: str, body: str, to: str | None = None,
+                    labels=("INBOX", "UNREAD"), when: float | None = None) -> str:
+        with self._lock:
+            msg_id = f"{self._next_id:016x}"
+            self._next_id += 1
+            when = when or time.time()
+            msg = {
+                "id": msg_id,
+                "threadId": msg_id,
+                "labelIds": list(labels),
+                "snippet": body[:200],
+                "internalDate": str(int(when * 1000)),
+                "headers": {
+                    "From": sender,
+                    "To": to or self.address,
+                    "Subject": subject,
+                    "Date": datetime.fromtimestamp(when, timezone.utc).strftime("%a, %d %b %Y %H:%M:%S +0000")
+                },
+                "body": body
+            }
+            self.messages[msg_id] = msg
+            msg["historyId"] = str(self._record(messagesAdded=[{"message": self._minimal(msg)}]))
+            return msg_id
+
+    def delete_message(self, msg_id: str):
+        with self._lock:
+            msg = self.messages.pop(msg_id)
+            self._record(messagesDeleted=[{"message": self._minimal(msg)}])
+
+    def set_labels(self, msg_id: str, add=(), remove=()):
+        with self._lock:
+            msg = self.messages[msg_id]
+            msg["labelIds"] = [l for l in msg["labelIds"] if l not in remove] + [l for l in add if l not in msg["labelIds"]]
+            if add:
+                self._record(labelsAdded=[{"message": self._minimal(msg), "labelIds": list(add)}])
+            if remove:
+                self._record(labelsRemoved=[{"message": self._minimal(msg), "labelIds": list(remove)}])
+            msg["historyId"] = str(self.history_id)
+
+    def fail_gets(self, msg_ids, times: int = 1):
+        """Answer the next `times` messages.get of each id with 429 rateLimitExceeded."""
+        with self._lock:
+            for msg_id in msg_ids:
+                self.failures[msg_id] = times
+
+    def expire_history(self):
+        """Drop all retained history, as Gmail does after about a week."""
+        with self._lock:
+            self.history.clear()
+            self.oldest_history = self.history_id
+
+    def populate(self, n: int, seed: int = 0):
+        rng = random.Random(seed)
+        start = time.time() - n * 60
+        for i in range(n):
+            words = rng.sample(WORDS, 3)
+            self.add_message(f"sender{rng.randrange(20)}@example.com", f"{words[0].title()} {words[1]} #{i}",
+                             f"About the {words[0]}, {words[1]} and {words[2]}. " * 3, when=start + i * 60)
+
+    # — API (server side) —
+
+    @staticmethod
+    def _minimal(msg: dict) -> dict:
+        return {"id": msg["id"], "threadId": msg["threadId"], "labelIds": list(msg["labelIds"])}
+
+    def _format(self, msg: dict, fmt: str, headers: list) -> dict:
+        out = {**self._minimal(msg), "snippet": msg["snippet"], "historyId": msg["historyId"],
+               "internalDate": msg["internalDate"], "sizeEstimate": len(msg["body"])}
+        if fmt == "minimal":
+            return out
+        wanted = [h.lower() for h in headers]
+        payload = {"mimeType": "text/plain", "headers": [
+            {"name": k, "value": v} for k, v in msg["headers"].items() if fmt == "full" or not wanted or k.lower() in wanted
+        ]}
+        if fmt == "full":
+            payload["body"] = {"size": len(msg["body"]),
+                               "data": base64.urlsafe_b64encode(msg["body"].encode()).decode()}
+        out["payload"] = payload
+        return out
+
+    def _matches(self, msg: dict, q: str) -> bool:
+        for term in q.lower().split():
+            field, _, value = term.rpartition(":")
+            h = msg["headers"]
+            if field in ("from", "to", "subject"):
+                ok = value in h[field.title()].lower()
+            elif field in ("is", "in", "label"):
+                ok = value.upper() in msg["labelIds"]
+            else:
+                ok = term in f"{h['From']} {h['Subject']} {msg['body']}".lower()
+            if not ok:
+                return False
+        return True
+
+    def handle(self, method: str, url: str, body: bytes) -> tuple:
+        """One API call. @return - (status, json body)"""
+        parts = urlsplit(url)
+        path, query = parts.path, parse_qs(parts.query)
+        one = lambda k, d=None: query.get(k, [d])[0]
+        with self._lock:
+            self.calls += 1
+            if not path.startswith(PREFIX):
+                return 404, {"error": {"code": 404, "message": f"Unknown path {path}"}}
+            path = path[len(PREFIX):]
+
+            if method == "GET" and path == "/profile":
+                return 200, {"emailAddress": self.address, "messagesTotal": len(self.messages),
+                             "threadsTotal": len(self.messages), "historyId": str(self.history_id)}
+
+            if method == "GET" and path == "/messages":
+                q = one("q", "")
+                # like Gmail, SPAM and TRASH are left out unless includeSpamTrash is set
+                hidden = set() if one("includeSpamTrash", "false") == "true" else HIDDEN_LABELS
+                hits = sorted((m for m in self.messages.values()
+                               if self._matches(m, q) and not hidden & set(m["labelIds"])),
+                              key=lambda m: int(m["internalDate"]), reverse=True)
+                start = int(one("pageToken", 0))
+                size  = min(int(one("maxResults", 100)), 500)
+                page  = hits[start:start + size]
+                out = {"messages": [{"id": m["id"], "threadId": m["threadId"]} for m in page],
+                       "resultSizeEstimate": len(hits)}
+                if not page:
+                    del out["messages"]
+                if start + size < len(hits):
+                    out["nextPageToken"] = str(start + size)
+                return 200, out
+
+            m = re.fullmatch(r"/messages/([0-9a-f]+)", path)
+            if method == "GET" and m:
+                if self.failures.get(m.group(1)):
+                    self.failures[m.group(1)] -= 1
+                    return 429, {"error": {"code": 429, "message": "Rate Limit Exceeded",
+                                           "errors": [{"reason": "rateLimitExceeded"}]}}
+                msg = self.messages.get(m.group(1))
+                if msg is None:
+                    return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+                return 200, self._format(msg, one("format", "full"), query.get("metadataHeaders", []))
+
+            if method == "POST" and path == "/messages/send":
+                raw = base64.urlsafe_b64decode(json.loads(body)["raw"]).decode()
+                mime = Parser().parsestr(raw)
+                msg_id = self.add_message(self.address, mime["subject"] or "", mime.get_payload(),
+                                          to=mime["to"], labels=("SENT",))
+                return 200, {**self._minimal(self.messages[msg_id])}
+
+            if method == "GET" and path == "/history":
+                start = int(one("startHistoryId", 0))
+                if start < self.oldest_history:
+                    return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+                records = [h for h in self.history if h["id"] > start]
+                offset  = int(one("pageToken", 0))
+                size    = min(int(one("maxResults", 100)), 500)
+                out = {"history": records[offset:offset + size], "historyId": str(self.history_id)}
+                if offset + size < len(records):
+                    out["nextPageToken"] = str(offset + size)
+                return 200, out
+
+        return 404, {"error": {"code": 404, "message": f"Unsupported {method} {path}"}}
+
+    def handle_batch(self, content_type: str, body: bytes) -> tuple:
+        """multipart/mixed in, multipart/mixed out. @return - (boundary, body)"""
+        message = Parser().parsestr(f"Content-Type: {content_type}\r\n\r\n{body.decode()}")
+        boundary = f"batch_{random.getrandbits(64):016x}"
+        out = []
+        for part in message.get_payload():
+            head, _, sub_body = part.get_payload().replace("\r\n", "\n").partition("\n\n")
+            method, url, _ = head.splitlines()[0].split(" ", 2)
+            status, data = self.handle(method, url, sub_body.encode())
+            content_id = part["Content-ID"][1:-1]
+            out.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\nContent-Type: application/json\r\n\r\n"
+                f"{json.dumps(data)}\r\n"
+            )
+        return boundary, "".join(out) + f"--{boundary}--\r\n"
+
+    # — HTTP —
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _serve(self, method: str):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with fake._lock:
+                    fake.requests += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if method == "POST" and self.path.split("?")[0].startswith("/batch"):
+                    boundary, out = fake.handle_batch(self.headers["Content-Type"], body)
+                    return self._reply(200, out.encode(), f"multipart/mixed; boundary={boundary}")
+                status, data = fake.handle(method, self.path, body)
+                self._reply(status, json.dumps(data).encode(), "application/json")
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> "FakeGmail":
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        threading.Thread(target=self._server.serve_forever, name="fake-gmail", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def client(self):
+        """A GmailClient talking to this fake (no OAuth)."""
+        from .client import GmailClient
+        return GmailClient(api_root=self.url)
+
+
+@app.command()
+def main(
+        port: int = typer.Option(8099, help="Port"),
+        messages: int = typer.Option(100, help="Synthetic messages to start with"),
+        latency_ms: float = typer.Option(0.0, help="Delay added to every HTTP request")
+    ):
+    """Serve a fake Gmail API with a synthetic mailbox."""
+    fake = FakeGmail(latency=latency_ms / 1000)
+    fake.populate(messages)
+    fake.start(port=port)
+    print(f"→ Fake Gmail API with {messages} messages on {fake.url} (GMAIL_API_ROOT={fake.url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    app()
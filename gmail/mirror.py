@@ -0,0 +1,273 @@
+# mirror.py
+"""
+Local SQLite mirror of mailbox metadata (headers, labels, snippet) with an FTS5 index.
+- first sync     : profile historyId, then list + batched metadata get of the newest MIRROR_LIMIT messages
+- later syncs    : history.list from the stored historyId; added / relabelled messages are re-fetched
+                   in batches, deleted / spammed / trashed ones dropped, and all but the newest
+                   MIRROR_LIMIT trimmed
+- expired history: history.list answers 404 once the stored historyId is too old -> full resync
+Reads never touch the network. Query syntax is a subset of Gmail's:
+from:x  to:x  subject:x  is:/in:/label:X  and free words (full-text, prefix match).
+    python -m gmail.mirror sync
+    python -m gmail.mirror search "invoice from:ada"
+"""
+from pathlib import Path
+import os, re, sqlite3, sys, threading, time
+import typer
+from googleapiclient.errors import HttpError
+from tracing.spans import Tracer
+from .client import get_client
+from .read_mail import get_messages, list_messages, message_headers, METADATA_HEADERS
+
+MIRROR_PATH  = Path(os.environ.get("GMAIL_MIRROR_PATH", Path(__file__).resolve().parent / "mailbox.db"))
+MIRROR_LIMIT = int(os.environ.get("GMAIL_MIRROR_LIMIT", 5000))      # messages kept
+SEARCH_WEIGHTS = (5.0, 3.0, 1.0)        # bm25 weight of subject, sender, snippet
+HIDDEN_LABELS  = {"SPAM", "TRASH"}      # not mirrored, as messages.list leaves them out
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id            TEXT PRIMARY KEY,
+    thread_id     TEXT,
+    internal_date INTEGER,
+    sender        TEXT,
+    recipients    TEXT,
+    subject       TEXT,
+    date          TEXT,
+    snippet       TEXT,
+    labels        TEXT,          -- ",INBOX,UNREAD," so one LIKE finds a label
+    history_id    INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_messages_date ON messages(internal_date DESC);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    subject, sender, snippet, content='messages', content_rowid='rowid', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts(rowid, subject, sender, snippet) VALUES (new.rowid, new.subject, new.sender, new.snippet);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, subject, sender, snippet)
+        VALUES ('delete', old.rowid, old.subject, old.sender, old.snippet);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, subject, sender, snippet)
+        VALUES ('delete', old.rowid, old.subject, old.sender, old.snippet);
+    INSERT INTO messages_fts(rowid, subject, sender, snippet) VALUES (new.rowid, new.subject, new.sender, new.snippet);
+END;
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+COLUMNS = ("id", "thread_id", "internal_date", "sender", "recipients", "subject", "date", "snippet", "labels", "history_id")
+HEADER_COLUMNS = {"from": "sender", "to": "recipients", "subject": "subject"}
+
+app = typer.Typer()
+tracer = Tracer("gmail")
+
+
+def row_from_message(msg: dict) -> tuple:
+    hdrs = message_headers(msg)
+    return (msg["id"], msg.get("threadId"), int(msg.get("internalDate", 0)), hdrs.get("From", ""),
+            hdrs.get("To", ""), hdrs.get("Subject", ""), hdrs.get("Date", ""), msg.get("snippet", ""),
+            "," + ",".join(msg.get("labelIds", [])) + ",", int(msg.get("historyId", 0)))
+
+
+def parse_query(query: str | None) -> tuple:
+    """Gmail-style query -> (SQL conditions, params, FTS match or None)."""
+    conditions, params, words = [], [], []
+    for term in (query or "").split():
+        field, _, value = term.partition(":")
+        field = field.lower()
+        if value and field in HEADER_COLUMNS:
+            conditions.append(f"m.{HEADER_COLUMNS[field]} LIKE ?")
+            params.append(f"%{value}%")
+        elif value and field in ("is", "in", "label"):
+            conditions.append("m.labels LIKE ?")
+            params.append(f"%,{value.upper()},%")
+        else:
+            words += re.findall(r"\w+", term)
+    match = " ".join(f'"{w}"*' for w in words) or None
+    return conditions, params, match
+
+
+class Mirror:
+    def __init__(self, path: Path = MIRROR_PATH, client=None):
+        """@param: client - OPTIONAL; GmailClient to sync from, defaults to the process-wide one"""
+        self.path   = Path(path)
+        self.client = client
+        self._lock  = threading.RLock()          # one connection, shared by tool and sync threads
+        self._sync_lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def service(self):
+        return (self.client or get_client()).service()
+
+    # — State —
+
+    def get_state(self, key: str, default=None):
+        with self._lock:
+            row = self.db.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_state(self, key: str, value):
+        self.db.execute("INSERT OR REPLACE INTO state(key, value) VALUES (?, ?)", (key, str(value)))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.db.execute("SELECT count(*) FROM messages").fetchone()[0]
+
+    # — Sync —
+
+    def sync(self) -> dict:
+        """Bring the mirror up to date: incremental when possible, full otherwise."""
+        with self._sync_lock, tracer.span("mirror.sync") as span:
+            history_id = self.get_state("history_id")
+            started = time.perf_counter()
+            if history_id is None:
+                stats = self.full_sync()
+            else:
+                try:
+                    stats = self.incremental_sync(int(history_id))
+                except HttpError as e:
+                    if e.resp.status != 404:
+                        raise
+                    # history is only kept for about a week
+                    stats = self.full_sync()
+            stats["seconds"] = round(time.perf_counter() - started, 3)
+            span.set(**stats)
+            with self._lock:
+                self._set_state("last_sync", time.time())
+            return stats
+
+    def full_sync(self) -> dict:
+        service = self.service()
+        # read historyId first so changes made while we list are replayed by the next sync
+        with tracer.span("gmail.profile"):
+            history_id = service.users().getProfile(userId="me").execute()["historyId"]
+        with tracer.span("gmail.list"):
+            ids  = [m["id"] for m in list_messages(service, max_results=MIRROR_LIMIT)]
+        with tracer.span("gmail.batch_get", messages=len(ids)):
+            msgs = get_messages(service, ids, METADATA_HEADERS)
+        with self._lock, tracer.span("db.write", rows=len(msgs)):
+            self.db.execute("BEGIN")
+            self.db.execute("DELETE FROM messages")
+            self.db.executemany(f"INSERT INTO messages VALUES ({', '.join('?' * len(COLUMNS))})",
+                                [row_from_message(msgs[i]) for i in ids if i in msgs])
+            self._set_state("history_id", history_id)
+            self.db.execute("COMMIT")
+        return {"mode": "full", "messages": len(msgs)}
+
+    def incremental_sync(self, start_history_id: int) -> dict:
+        service = self.service()
+        with tracer.span("gmail.history"):
+            changed, deleted, latest = self.read_history(service, start_history_id)
+
+        with tracer.span("gmail.batch_get", messages=len(changed)):
+            msgs = get_messages(service, sorted(changed), METADATA_HEADERS) if changed else {}
+        # spam and trash are dropped like deletions, matching what a full sync (messages.list) keeps
+        msgs = {i: msg for i, msg in msgs.items() if not HIDDEN_LABELS & set(msg.get("labelIds", []))}
+        gone = deleted | (changed - msgs.keys())       # also: changed, then deleted before we fetched it
+        with self._lock, tracer.span("db.write", rows=len(msgs), deleted=len(gone)):
+            self.db.execute("BEGIN")
+            self.db.executemany("DELETE FROM messages WHERE id = ?", [(i,) for i in gone])
+            # upsert as UPDATE-or-INSERT so the FTS triggers see a proper old row
+            for msg in msgs.values():
+                row = row_from_message(msg)
+                updated = self.db.execute(
+                    f"UPDATE messages SET {', '.join(f'{c} = ?' for c in COLUMNS[1:])} WHERE id = ?",
+                    row[1:] + row[:1]).rowcount
+                if not updated:
+                    self.db.execute(f"INSERT INTO messages VALUES ({', '.join('?' * len(COLUMNS))})", row)
+            # keep the mirror the size a full sync would leave it
+            trimmed = self.db.execute(
+                "DELETE FROM messages WHERE id IN "
+                "(SELECT id FROM messages ORDER BY internal_date DESC LIMIT -1 OFFSET ?)", (MIRROR_LIMIT,)).rowcount
+            self._set_state("history_id", latest)
+            self.db.execute("COMMIT")
+        return {"mode": "incremental", "updated": len(msgs), "deleted": len(gone), "trimmed": trimmed}
+
+    @staticmethod
+    def read_history(service, start_history_id: int) -> tuple:
+        """history.list from start_history_id. @return - (changed ids, deleted ids, latest historyId)"""
+        changed, deleted, page_token = set(), set(), None
+        while True:
+            response = service.users().history().list(
+                userId="me", startHistoryId=start_history_id, pageToken=page_token, maxResults=500
+            ).execute()
+            for record in response.get("history", []):
+                for m in record.get("messagesDeleted", []):
+                    deleted.add(m["message"]["id"])
+                    changed.discard(m["message"]["id"])
+                for kind in ("messagesAdded", "labelsAdded", "labelsRemoved"):
+                    for m in record.get(kind, []):
+                        if m["message"]["id"] not in deleted:
+                            changed.add(m["message"]["id"])
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        return changed, deleted, response["historyId"]
+
+    def start_background_sync(self, interval: float):
+        """Sync now and then every `interval` seconds on a daemon thread."""
+        def loop():
+            while True:
+                try:
+                    stats = self.sync()
+                    print(f"→ Mailbox mirror synced: {stats}", file=sys.stderr)
+                except Exception as e:
+                    print(f"→ Mailbox mirror sync failed: {e}", file=sys.stderr)
+                time.sleep(interval)
+        threading.Thread(target=loop, name="gmail-mirror-sync", daemon=True).start()
+
+    # — Reads (local only) —
+
+    def query(self, query: str | None = None, limit: int = 10, rank: bool = False) -> list:
+        """
+        Messages matching a Gmail-style query.
+        @param: rank - order by full-text relevance instead of date (when the query has free words)
+        @return - dicts with the message columns plus "match" (highlighted snippet, or None)
+        """
+        conditions, params, match = parse_query(query)
+        if match:
+            sql = ("SELECT m.*, snippet(messages_fts, 2, '[', ']', '…', 16) AS match, "
+                   f"bm25(messages_fts, {', '.join(map(str, SEARCH_WEIGHTS))}) AS score "
+                   "FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid "
+                   "WHERE messages_fts MATCH ?")
+            params = [match] + params
+        else:
+            sql = "SELECT m.*, NULL AS match, 0 AS score FROM messages m WHERE 1"
+        sql += "".join(f" AND {c}" for c in conditions)
+        sql += " ORDER BY score, m.internal_date DESC" if rank and match else " ORDER BY m.internal_date DESC"
+        sql += " LIMIT ?"
+        with self._lock, tracer.span("mirror.query", rank=rank, limit=limit):
+            cursor = self.db.execute(sql, params + [limit])
+            names  = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+
+def format_row(row: dict) -> str:
+    labels = row["labels"].strip(",").replace(",", ", ")
+    return (f"Id: {row['id']}\nDate: {row['date']}\nFrom: {row['sender']}\nSubject: {row['subject'] or '(no subject)'}\n"
+            f"Labels: {labels}\nSnippet: {row['match'] or row['snippet']}\n---\n")
+
+
+@app.command()
+def sync():
+    """Sync the mirror with Gmail."""
+    mirror = Mirror()
+    print(f"→ {mirror.sync()} ({len(mirror)} messages mirrored)")
+
+
+@app.command()
+def search(query: str, limit: int = typer.Option(10, help="Max results")):
+    """Search the mirror without touching the network."""
+    print("".join(format_row(r) for r in Mirror().query(query, limit, rank=True)) or "No messages found.")
+
+
+if __name__ == "__main__":
+    app()
@@ -3,6 +3,7 @@ import pickle
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 
+TOKEN_PATH = "token.pickle"
 SCOPES = [
     "https://www.googleapis.com/auth/gmail.readonly",
     "https://www.googleapis.com/auth/gmail.send",
@@ -11,8 +12,8 @@ SCOPES = [
 def get_gmail_credentials():
     creds = None
     # Token storage
-    if os.path.exists("token.pickle"):
-        with open("token.pickle", "rb") as f:
+    if os.path.exists(TOKEN_PATH):
+        with open(TOKEN_PATH, "rb") as f:
             creds = pickle.load(f)
 
     # If no valid creds, run OAuth flow
@@ -25,7 +26,7 @@ def get_gmail_credentials():
             )
             creds = flow.run_local_server(port=0)
         # Save for next run
-        with open("token.pickle", "wb") as f:
+        with open(TOKEN_PATH, "wb") as f:
             pickle.dump(creds, f)
 
     return creds
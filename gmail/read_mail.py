@@ -1,48 +1,116 @@
 # read_mail.py
-from googleapiclient.discovery import build
-from .oauth import get_gmail_credentials
+"""
+Read message metadata with two kinds of round trip:
+1. messages.list, paged, until max_results ids (optionally filtered by a Gmail search query)
+2. messages.get(format="metadata") for every id, sent BATCH_SIZE at a time as one batch request
+Only the headers in METADATA_HEADERS and the snippet are downloaded, never MIME bodies.
+Parts of a batch that fail with a rate limit or a server error are retried in smaller
+batches after RETRY_BACKOFF_S waits; if some still fail, the error is raised, so callers
+never mistake a partial result for the whole mailbox.
+"""
+import sys, time
+from googleapiclient.errors import HttpError
+from .client import get_client
 
-def list_messages(service, max_results=10):
-    response = service.users().messages().list(
-        userId="me", maxResults=max_results
-    ).execute()
-    return response.get("messages", [])
+METADATA_HEADERS = ["From", "To", "Subject", "Date"]
+BATCH_SIZE = 50         # Gmail's recommended ceiling per batch
+PAGE_SIZE  = 500        # messages.list maximum
+RETRY_STATUS    = {429, 500, 502, 503, 504}
+RETRY_BACKOFF_S = (1, 2, 4, 8, 16)      # wait before each retry round; the batch size halves each round
+
+def list_messages(service, max_results=10, query=None):
+    """Up to max_results {"id", "threadId"}, newest first, following nextPageToken."""
+    messages, page_token = [], None
+    while len(messages) < max_results:
+        response = service.users().messages().list(
+            userId="me", maxResults=min(PAGE_SIZE, max_results - len(messages)),
+            q=query or None, pageToken=page_token
+        ).execute()
+        messages += response.get("messages", [])
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+    return messages[:max_results]
+
+def retryable(exception) -> bool:
+    """Rate limits (429, or 403 rateLimitExceeded) and server errors; not e.g. 404 for a deleted message."""
+    if not isinstance(exception, HttpError):
+        return False
+    status = exception.resp.status
+    return status in RETRY_STATUS or (status == 403 and b"ratelimitexceeded" in (exception.content or b"").lower())
+
+def get_messages(service, msg_ids, headers=METADATA_HEADERS):
+    """
+    Metadata for many messages through batch requests.
+    @return - {id: message resource}; ids that failed for good (e.g. deleted since listed) are logged and left out
+    @raise - HttpError when retryable failures outlast RETRY_BACKOFF_S
+    """
+    results, failed = {}, {}
+
+    def collect(request_id, response, exception):
+        if exception is None:
+            results[request_id] = response
+        elif retryable(exception):
+            failed[request_id] = exception
+        else:
+            print(f"→ messages.get {request_id} failed: {exception}", file=sys.stderr)
+
+    def fetch(ids, size):
+        for start in range(0, len(ids), size):
+            batch = service.new_batch_http_request(callback=collect)
+            for msg_id in ids[start:start + size]:
+                batch.add(service.users().messages().get(
+                    userId="me", id=msg_id, format="metadata", metadataHeaders=headers
+                ), request_id=msg_id)
+            batch.execute()
+
+    fetch(list(msg_ids), BATCH_SIZE)
+    size = BATCH_SIZE
+    for delay in RETRY_BACKOFF_S:
+        if not failed:
+            break
+        ids, size = list(failed), max(1, size // 2)
+        failed.clear()
+        print(f"→ Retrying {len(ids)} messages.get in {delay}s, {size} per batch", file=sys.stderr)
+        time.sleep(delay)
+        fetch(ids, size)
+    if failed:
+        raise next(iter(failed.values()))
+    return results
 
 def get_message(service, msg_id):
     msg = service.users().messages().get(
-        userId="me", id=msg_id, format="full"
+        userId="me", id=msg_id, format="metadata", metadataHeaders=METADATA_HEADERS
     ).execute()
-    headers = {h["name"]: h["value"] for h in msg["payload"]["headers"]}
-    snippet = msg.get("snippet")
-    return headers, snippet
+    return message_headers(msg), msg.get("snippet")
 
-def read_latest_emails(max_results=5):
-    creds = get_gmail_credentials()
-    service = build("gmail", "v1", credentials=creds)
+def message_headers(msg):
+    return {h["name"]: h["value"] for h in msg.get("payload", {}).get("headers", [])}
 
-    msgs = list_messages(service, max_results=max_results)
-    if not msgs:
-        print("No messages found.")
-        return
+def format_message(msg):
+    hdrs    = message_headers(msg)
+    subject = hdrs.get("Subject", "(no subject)")
+    sender  = hdrs.get("From", "(unknown)")
+    return f"From: {sender}\nSubject: {subject}\nSnippet: {msg.get('snippet')}\n---\n"
 
-    data = ""
-    for m in msgs:
-        hdrs, snippet = get_message(service, m["id"])
-        subject = hdrs.get("Subject", "(no subject)")
-        sender  = hdrs.get("From", "(unknown)")
-        data += f"From: {sender}\nSubject: {subject}\nSnippet: {snippet}\n---\n"
-    return data
+def read_emails(max_results=5, query=None, service=None):
+    """Message resources (metadata only), newest first."""
+    service = service or get_client().service()
+    ids  = [m["id"] for m in list_messages(service, max_results=max_results, query=query)]
+    msgs = get_messages(service, ids)
+    return [msgs[i] for i in ids if i in msgs]
+
+def read_latest_emails(max_results=5, query=None, service=None):
+    try:
+        msgs = read_emails(max_results, query, service)
+    except HttpError as e:
+        return f"Error reading emails: {e}"
+    if not msgs:
+        return "No messages found."
+    return "".join(format_message(m) for m in msgs)
 
 def main():
-    creds = get_gmail_credentials()
-    service = build("gmail", "v1", credentials=creds)
-
-    msgs = list_messages(service, max_results=5)
-    for m in msgs:
-        hdrs, snippet = get_message(service, m["id"])
-        subject = hdrs.get("Subject", "(no subject)")
-        sender  = hdrs.get("From", "(unknown)")
-        print(f"From: {sender}\nSubject: {subject}\nSnippet: {snippet}\n---")
+    print(read_latest_emails(max_results=5))
 
 if __name__ == "__main__":
     main()
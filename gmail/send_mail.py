@@ -1,8 +1,8 @@
 # send_mail.py
 import base64
+import sys
 from email.mime.text import MIMEText
-from googleapiclient.discovery import build
-from .oauth import get_gmail_credentials
+from .client import get_client
 
 def create_message(to, subject, body_text):
     message = MIMEText(body_text)
@@ -15,18 +15,16 @@ def send_message(service, message):
     sent = service.users().messages().send(
         userId="me", body=message
     ).execute()
-    print("Message Id:", sent["id"])
+    print("Message Id:", sent["id"], file=sys.stderr)     # stdout may be the MCP transport
     return sent
 
-def send_email(to, subject, body_text):
-    creds = get_gmail_credentials()
-    service = build("gmail", "v1", credentials=creds)
+def send_email(to, subject, body_text, service=None):
+    service = service or get_client().service()
     message = create_message(to, subject, body_text)
     return send_message(service, message)
 
 def main():
-    creds = get_gmail_credentials()
-    service = build("gmail", "v1", credentials=creds)
+    service = get_client().service()
 
     msg = create_message(
         to="friend@example.com",
@@ -0,0 +1,165 @@
+# ann.py
+"""
+Index types for the RAG store.
+- flat     : exact IndexFlatIP, search cost linear in corpus size
+- ivf_flat : inverted lists over full vectors, tuned with `nprobe`
+- ivf_pq   : inverted lists over product-quantized vectors, smallest on disk
+- hnsw     : graph index, tuned with `efSearch`; does not support removals
+Every index is wrapped in an IndexIDMap2 so chunk IDs survive incremental updates.
+"""
+from pathlib import Path
+import math, time, numpy as np, faiss
+import typer
+from rag.paths import INDEX_PATH
+
+INDEX_TYPES       = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+DEFAULT_NPROBE    = 16
+DEFAULT_EF_SEARCH = 64
+HNSW_M            = 32
+TRAIN_POINTS      = 39      # faiss wants ~39 training points per centroid
+
+app = typer.Typer()
+
+
+def auto_nlist(n: int) -> int:
+    """~4·sqrt(n) inverted lists, capped so every list still gets enough training points."""
+    return max(1, min(int(4 * math.sqrt(max(n, 1))), n // TRAIN_POINTS))
+
+
+def pq_params(dim: int, n: int):
+    """Subquantizer count that divides `dim`, and a code size the corpus can train."""
+    m = next((m for m in (64, 48, 32, 24, 16, 8, 4, 2, 1) if dim % m == 0 and m <= dim), 1)
+    nbits = max(1, min(8, int(math.log2(max(n // TRAIN_POINTS, 2)))))
+    return m, nbits
+
+
+def make_index(kind: str, dim: int, n: int, nlist: int = 0):
+    """
+    Build an empty, ID-mapped inner-product index.
+    @param: kind - one of INDEX_TYPES
+    @param: n - expected number of vectors, used to size the IVF lists
+    @param: nlist - OPTIONAL; inverted list count, 0 picks one from n
+    """
+    if kind == "flat":
+        base = faiss.IndexFlatIP(dim)
+    elif kind == "ivf_flat":
+        base = faiss.IndexIVFFlat(faiss.IndexFlatIP(dim), dim, nlist or auto_nlist(n), faiss.METRIC_INNER_PRODUCT)
+    elif kind == "ivf_pq":
+        m, nbits = pq_params(dim, n)
+        base = faiss.IndexIVFPQ(faiss.IndexFlatIP(dim), dim, nlist or auto_nlist(n), m, nbits, faiss.METRIC_INNER_PRODUCT)
+    elif kind == "hnsw":
+        base = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    else:
+        raise ValueError(f"Unknown index type {kind!r}, expected one of {INDEX_TYPES}")
+    return faiss.IndexIDMap2(base)
+
+
+def index_kind(index) -> str:
+    """Inverse of make_index: which INDEX_TYPES entry a (loaded) index is."""
+    base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(base, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(base, faiss.IndexIVFFlat):
+        return "ivf_flat"
+    if isinstance(base, faiss.IndexHNSWFlat):
+        return "hnsw"
+    return "flat"
+
+
+def train(index, vectors: np.ndarray, max_points: int = 100_000):
+    """Train an IVF index on an evenly spaced sample; a no-op for flat/HNSW."""
+    if index.is_trained:
+        return
+    step   = max(1, len(vectors) // max_points)
+    sample = np.ascontiguousarray(vectors[::step][:max_points], dtype="float32")
+    index.train(sample)
+
+
+def search_params(index, nprobe: int | None = None, ef_search: int | None = None):
+    """Per-query search parameters, so tuning never mutates the shared index."""
+    kind = index_kind(index)
+    if kind in ("ivf_flat", "ivf_pq"):
+        return faiss.SearchParametersIVF(nprobe=nprobe or DEFAULT_NPROBE)
+    if kind == "hnsw":
+        return faiss.SearchParametersHNSW(efSearch=ef_search or DEFAULT_EF_SEARCH)
+    return None
+
+
+def search(index, queries: np.ndarray, k: int, nprobe: int | None = None, ef_search: int | None = None):
+    """index.search with the tuning knobs for the index's type."""
+    params = search_params(index, nprobe, ef_search)
+    if params is None:
+        return index.search(queries, k)
+    return index.search(queries, k, params=params)
+
+
+def stored_vectors(index) -> np.ndarray | None:
+    """Raw vectors held by a flat or HNSW index, or None for quantized ones."""
+    base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(base, faiss.IndexHNSWFlat):
+        base = faiss.downcast_index(base.storage)
+    if not isinstance(base, faiss.IndexFlat):
+        return None
+    return faiss.rev_swig_ptr(base.get_xb(), base.ntotal * base.d).reshape(base.ntotal, base.d).copy()
+
+
+def recall_report(vectors: np.ndarray, n_queries: int = 200, k: int = 5,
+                  kinds=INDEX_TYPES, nprobes=(1, 4, 16, 64), efs=(16, 64, 256), seed: int = 0):
+    """
+    Build every index type over `vectors` and compare it against the flat baseline.
+    @return - list of rows {"index", "param", "recall@k", "ms/query", "build_s"}
+    """
+    rng     = np.random.default_rng(seed)
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    queries = vectors[rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)]
+    ids     = np.arange(len(vectors), dtype="int64")
+
+    rows, truth = [], None
+    for kind in ("flat",) + tuple(k_ for k_ in kinds if k_ != "flat"):
+        t0    = time.perf_counter()
+        index = make_index(kind, vectors.shape[1], len(vectors))
+        train(index, vectors)
+        index.add_with_ids(vectors, ids)
+        build = time.perf_counter() - t0
+
+        sweep = [("nprobe", p) for p in nprobes] if kind.startswith("ivf") else \
+                [("efSearch", e) for e in efs] if kind == "hnsw" else [("-", None)]
+        for name, value in sweep:
+            t0 = time.perf_counter()
+            _, found = search(index, queries, k,
+                              nprobe=value if name == "nprobe" else None,
+                              ef_search=value if name == "efSearch" else None)
+            ms = (time.perf_counter() - t0) * 1000 / len(queries)
+            if truth is None:
+                truth = found
+            recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+            rows.append({"index": kind, "param": f"{name}={value}" if value else "-",
+                         "recall@k": round(float(recall), 4), "ms/query": round(ms, 4), "build_s": round(build, 3)})
+    return rows
+
+
+@app.command()
+def report(
+        index_path: Path = typer.Option(INDEX_PATH, help="Built index to read vectors from (default $RAG_INDEX_PATH)"),
+        queries: int = typer.Option(200, help="Number of sampled query vectors"),
+        k: int = typer.Option(5, help="Neighbours per query")
+    ):
+    """Print recall@k vs latency for every index type over the current corpus."""
+    vectors = stored_vectors(faiss.read_index(str(index_path)))
+    if vectors is None:
+        # quantized index: re-encode the corpus once to get exact vectors
+        from rag.embedder import encode
+        from rag.paths import STORE_PATH
+        from rag.chunk_store import ChunkStore
+        from rag.embedding import get_embedder
+        store, model = ChunkStore(STORE_PATH), get_embedder()
+        ids     = store.ids()
+        vectors = np.concatenate([encode(model, store.texts(ids[i:i + 1024]), 256) for i in range(0, len(ids), 1024)])
+
+    print(f"{'index':<10}{'param':<14}{'recall@' + str(k):>10}{'ms/query':>10}{'build_s':>10}")
+    for r in recall_report(vectors, queries, k):
+        print(f"{r['index']:<10}{r['param']:<14}{r['recall@k']:>10}{r['ms/query']:>10}{r['build_s']:>10}")
+
+
+if __name__ == "__main__":
+    app()
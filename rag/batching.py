@@ -0,0 +1,84 @@
+# batching.py
+"""
+Micro-batching for concurrent callers.
+Requests queue up while a batch is in flight; the worker then takes everything waiting
+(up to max_batch items, or whatever arrived within max_wait) and runs `fn` once over it.
+The queue is bounded: when it is full, submit() raises Busy instead of piling up latency.
+"""
+from concurrent.futures import Future
+import queue, threading, time
+
+
+class Busy(Exception):
+    """The batcher's queue is full; the caller should back off and retry."""
+
+
+class MicroBatcher:
+    def __init__(self, fn, max_batch: int = 64, max_wait: float = 0.005, max_queue: int = 256, name: str = "batcher"):
+        """
+        @param: fn - called with a list of items, must return one result per item, in order
+        @param: max_batch - items per call to fn
+        @param: max_wait - seconds to wait for more requests once the first one arrived
+        @param: max_queue - pending requests before submit() raises Busy
+        """
+        self.fn        = fn
+        self.max_batch = max_batch
+        self.max_wait  = max_wait
+        self._queue    = queue.Queue(maxsize=max_queue)
+        self.batches = self.items = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, items: list, timeout: float | None = 0) -> Future:
+        """
+        Queue items for the next batch.
+        @param: timeout - seconds to wait for queue space, 0 to fail fast, None to block
+        @return - Future resolving to the list of results for these items
+        """
+        fut = Future()
+        try:
+            self._queue.put((list(items), fut), block=timeout != 0, timeout=timeout or None)
+        except queue.Full:
+            raise Busy(f"{self._thread.name} queue is full ({self._queue.maxsize} pending requests)")
+        return fut
+
+    def __call__(self, items: list, timeout: float | None = None) -> list:
+        """Blocking submit-and-wait."""
+        return self.submit(items, timeout=timeout).result()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _collect(self) -> list:
+        requests = [self._queue.get()]
+        size     = len(requests[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                req = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            requests.append(req)
+            size += len(req[0])
+        return requests
+
+    def _run(self):
+        while True:
+            requests = self._collect()
+            requests = [(items, fut) for items, fut in requests if fut.set_running_or_notify_cancel()]
+            if not requests:
+                continue
+            flat = [item for items, _ in requests for item in items]
+            try:
+                results = self.fn(flat)
+            except BaseException as e:
+                for _, fut in requests:
+                    fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.items   += len(flat)
+            start = 0
+            for items, fut in requests:
+                fut.set_result(results[start:start + len(items)])
+                start += len(items)
@@ -0,0 +1,89 @@
+# cache.py
+"""
+Query cache for retrieval.
+Entries are keyed on normalized query text and hold the query embedding plus the
+top-k hit IDs/scores of the last search. The whole cache is dropped whenever the
+index version it was filled against changes.
+"""
+from collections import OrderedDict
+import threading, time
+import numpy as np
+
+
+class QueryCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 600.0):
+        """
+        @param: maxsize - entries kept before the least recently used is evicted
+        @param: ttl - seconds an entry stays valid, 0 for no expiry
+        """
+        self.maxsize = maxsize
+        self.ttl     = ttl
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._version = None
+        self._lock    = threading.Lock()
+        self.hits = self.partial_hits = self.misses = 0
+        self.evictions = self.invalidations = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def validate(self, version):
+        """Clear the cache if it was filled against a different index version."""
+        with self._lock:
+            if version == self._version:
+                return
+            if self._version is not None:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, query: str) -> dict | None:
+        """
+        @return - {"emb", "ids", "scores", "params"} or None; "ids" may be None
+                  when only the embedding is cached
+        """
+        key = self.normalize(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self.ttl and time.monotonic() - entry["at"] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, query: str, emb: np.ndarray, ids=None, scores=None, params=None):
+        key = self.normalize(query)
+        with self._lock:
+            self._entries[key] = {"emb": emb, "ids": ids, "scores": scores, "params": params,
+                                  "at": time.monotonic()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def record(self, hit: bool, partial: bool = False):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            elif partial:
+                self.partial_hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.partial_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "embedding_hits": self.partial_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
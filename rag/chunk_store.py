@@ -0,0 +1,206 @@
+# chunk_store.py
+"""
+Random-access chunk store shared by the indexer, embedder and mcp_files.
+On disk, for a prefix like rag/docs_chunks:
+- docs_chunks.txt  : UTF-8 chunk texts, appended back to back
+- docs_chunks.idx  : one fixed-width record per vector ID (offset, length, source, idx, live)
+- docs_chunks.json : {"base": first vector ID, "sources": [source paths]}
+Record n holds vector ID base + n, so lookups are O(1) through mmap and a reader
+only touches the chunks it returns. Deletes are tombstones; a full re-index
+starts a fresh store whose base continues after the old IDs.
+"""
+from pathlib import Path
+import json, mmap, pickle, numpy as np
+import typer
+from rag.paths import META_PATH, STORE_PATH
+
+RECORD = np.dtype([("offset", "<i8"), ("length", "<i4"), ("source", "<i4"), ("idx", "<i4"), ("live", "u1")])
+LIVE_OFFSET = RECORD.fields["live"][1]
+
+app = typer.Typer()
+
+
+class ChunkStore:
+    def __init__(self, prefix: Path):
+        """Open an existing store read-only; call refresh() to see later appends."""
+        self.prefix = Path(prefix)
+        self.refresh()
+
+    @property
+    def text_path(self) -> Path:
+        return self.prefix.with_suffix(".txt")
+
+    @property
+    def index_path(self) -> Path:
+        return self.prefix.with_suffix(".idx")
+
+    @property
+    def meta_path(self) -> Path:
+        return self.prefix.with_suffix(".json")
+
+    @classmethod
+    def create(cls, prefix: Path, base: int = 0) -> "ChunkStore":
+        """Start an empty store (replacing any existing one) whose first vector ID is `base`."""
+        prefix = Path(prefix)
+        # new inodes, so readers still mapping the old files are not truncated under them
+        for suffix in (".txt", ".idx"):
+            tmp = prefix.with_suffix(suffix + ".tmp")
+            tmp.write_bytes(b"")
+            tmp.replace(prefix.with_suffix(suffix))
+        _write_json(prefix.with_suffix(".json"), {"base": base, "sources": []})
+        return cls(prefix)
+
+    @classmethod
+    def exists(cls, prefix: Path) -> bool:
+        prefix = Path(prefix)
+        return all(prefix.with_suffix(s).exists() for s in (".txt", ".idx", ".json"))
+
+    def refresh(self):
+        """(Re)map the files, picking up appends made since the store was opened."""
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.base    = meta["base"]
+        self.sources = meta["sources"]
+        self._source_ids = None
+        size = self.index_path.stat().st_size
+        self._records = np.memmap(self.index_path, dtype=RECORD, mode="r") if size else np.zeros(0, RECORD)
+        self._blob = b""
+        if self.text_path.stat().st_size:
+            with open(self.text_path, "rb") as f:
+                self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # — Reads —
+
+    @property
+    def next_id(self) -> int:
+        return self.base + len(self._records)
+
+    def __len__(self) -> int:
+        return int(self._records["live"].sum())
+
+    def ids(self) -> np.ndarray:
+        """Live vector IDs, ascending."""
+        return np.flatnonzero(self._records["live"]).astype("int64") + self.base
+
+    def get(self, vec_id: int) -> dict | None:
+        """Chunk for a vector ID, or None if it was deleted or never existed."""
+        row = int(vec_id) - self.base
+        if row < 0 or row >= len(self._records):
+            return None
+        rec = self._records[row]
+        if not rec["live"]:
+            return None
+        start = int(rec["offset"])
+        return {
+            "id":     int(vec_id),
+            "text":   self._blob[start:start + int(rec["length"])].decode("utf-8"),
+            "source": self.sources[rec["source"]],
+            "idx":    int(rec["idx"])
+        }
+
+    def get_many(self, vec_ids) -> list:
+        return [self.get(i) for i in vec_ids]
+
+    def texts(self, vec_ids) -> list:
+        """Texts only, for the embedder's batches."""
+        return [c["text"] for c in self.get_many(vec_ids)]
+
+    def __iter__(self):
+        for vec_id in self.ids():
+            yield self.get(vec_id)
+
+    # — Writes (single writer: the indexer) —
+
+    def append(self, files) -> list:
+        """
+        Append chunks for several files in one write.
+        @param: files - iterable of (source, texts) or (source, texts, idxs); idxs default to 0..n-1
+        @return - per file, the vector IDs assigned to its chunks
+        """
+        if self._source_ids is None:
+            self._source_ids = {s: n for n, s in enumerate(self.sources)}
+        offset, first = self.text_path.stat().st_size, self.next_id
+        out, recs = [], []
+        with open(self.text_path, "ab") as f:
+            for source, texts, *idxs in files:
+                if source not in self._source_ids:
+                    self._source_ids[source] = len(self.sources)
+                    self.sources.append(source)
+                idxs = idxs[0] if idxs else range(len(texts))
+                for t, i in zip(texts, idxs):
+                    b = t.encode("utf-8")
+                    recs.append((offset, len(b), self._source_ids[source], i, 1))
+                    f.write(b)
+                    offset += len(b)
+                out.append(np.arange(first, first + len(texts), dtype="int64"))
+                first += len(texts)
+        with open(self.index_path, "ab") as f:
+            f.write(np.array(recs, dtype=RECORD).tobytes())
+        self._flush_meta()
+        self.refresh()
+        return out
+
+    def delete_sources(self, sources) -> int:
+        """Tombstone every chunk of the given sources. @return - number of chunks deleted"""
+        sources = set(sources)
+        wanted  = [n for n, s in enumerate(self.sources) if s in sources]
+        rows    = np.flatnonzero(self._records["live"].astype(bool) & np.isin(self._records["source"], wanted))
+        with open(self.index_path, "r+b") as f:
+            for row in rows:
+                f.seek(int(row) * RECORD.itemsize + LIVE_OFFSET)
+                f.write(b"\x00")
+        self.refresh()
+        return len(rows)
+
+    def _flush_meta(self):
+        _write_json(self.meta_path, {"base": self.base, "sources": self.sources})
+
+
+def _write_json(path: Path, data: dict):
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    tmp.replace(path)
+
+
+def migrate_pickle(pkl_path: Path, prefix: Path) -> ChunkStore:
+    """
+    Convert a docs_metadata.pkl list into a store, keeping its vector IDs.
+    Lists written before chunks had IDs use list position, like the old index did.
+    Gaps in the ID sequence become tombstones.
+    """
+    with open(pkl_path, "rb") as f:
+        chunks = pickle.load(f)
+    ids  = [c.get("id", n) for n, c in enumerate(chunks)]
+    base = min(ids, default=0)
+    store = ChunkStore.create(prefix, base=base)
+
+    sources = {}
+    recs    = np.zeros(max(ids, default=base - 1) - base + 1, RECORD)
+    offset  = 0
+    with open(store.text_path, "ab") as f:
+        for vec_id, c in sorted(zip(ids, chunks), key=lambda p: p[0]):
+            b = c["text"].encode("utf-8")
+            recs[vec_id - base] = (offset, len(b), sources.setdefault(c["source"], len(sources)), c["idx"], 1)
+            f.write(b)
+            offset += len(b)
+    with open(store.index_path, "ab") as f:
+        f.write(recs.tobytes())
+    store.sources = list(sources)
+    store._flush_meta()
+    store.refresh()
+    return store
+
+
+@app.command()
+def migrate(
+        pkl: Path = typer.Argument(META_PATH, help="Pickled chunk list (default $RAG_META_PATH)"),
+        prefix: Path = typer.Option(STORE_PATH, help="Store path prefix (default $RAG_STORE_PATH)")
+    ):
+    """Convert docs_metadata.pkl into a chunk store."""
+    store = migrate_pickle(pkl, prefix)
+    print(f"→ Migrated {len(store)} chunks into {prefix}.*")
+
+
+if __name__ == "__main__":
+    app()
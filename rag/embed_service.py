@@ -0,0 +1,89 @@
+# embed_service.py
+"""
+Shared embedding service.
+Holds one SentenceTransformer for every indexer run and MCP server on the machine.
+Concurrent /encode requests are micro-batched into a single forward pass.
+- GET  /health : {"model", "dim", "batches", "items", "pending"}
+- POST /encode : {"texts": [...]} -> raw little-endian float32, shape (len(texts), dim); (0, dim) for no texts
+                 503 with Retry-After while the batch queue is full
+Clients use rag.embedding.RemoteEmbedder (picked automatically by get_embedder()).
+Run from the repo root: python -m rag.embed_service --port 8765
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import json
+import numpy as np
+import typer
+from rag.batching import MicroBatcher, Busy
+from rag.embedding import LocalEmbedder, MODEL_NAME
+
+app = typer.Typer()
+
+
+def make_handler(embedder: LocalEmbedder, batcher: MicroBatcher):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"     # keep-alive for RemoteEmbedder's session
+
+        def _send(self, status: int, body: bytes, content_type: str, headers: dict | None = None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, status: int, data: dict, headers: dict | None = None):
+            self._send(status, json.dumps(data).encode(), "application/json", headers)
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self._json(404, {"error": "not found"})
+            self._json(200, {"model": embedder.model_name, "dim": embedder.get_sentence_embedding_dimension(),
+                             "batches": batcher.batches, "items": batcher.items, "pending": batcher.pending()})
+
+        def do_POST(self):
+            if self.path != "/encode":
+                return self._json(404, {"error": "not found"})
+            try:
+                body  = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                texts = json.loads(body)["texts"]
+                if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                    raise ValueError(texts)
+            except (ValueError, KeyError, TypeError):
+                return self._json(400, {"error": "expected {\"texts\": [...]}"})
+            dim = embedder.get_sentence_embedding_dimension()
+            if not texts:
+                vecs = np.zeros((0, dim), dtype="<f4")
+            else:
+                try:
+                    rows = batcher(texts, timeout=5.0)
+                except Busy as e:
+                    return self._json(503, {"error": str(e)}, {"Retry-After": "1"})
+                vecs = np.asarray(rows, dtype="<f4").reshape(len(texts), dim)
+            self._send(200, vecs.tobytes(), "application/octet-stream", {"X-Shape": f"{vecs.shape[0]},{vecs.shape[1]}"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+@app.command()
+def main(
+        host: str = typer.Option("127.0.0.1", help="Bind address; keep it local"),
+        port: int = typer.Option(8765, help="Port"),
+        model: str = typer.Option(MODEL_NAME, help="SentenceTransformer model to serve"),
+        max_batch: int = typer.Option(256, help="Texts per forward pass"),
+        max_wait_ms: float = typer.Option(5.0, help="How long to gather concurrent requests into one batch")
+    ):
+    """Serve one embedding model to every local client."""
+    embedder = LocalEmbedder(model)
+    batcher  = MicroBatcher(lambda texts: embedder.encode(texts, batch_size=max_batch),
+                            max_batch=max_batch, max_wait=max_wait_ms / 1000, name="embed-batcher")
+    server = ThreadingHTTPServer((host, port), make_handler(embedder, batcher))
+    print(f"→ Serving {model} on http://{host}:{port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    app()
@@ -1,25 +1,148 @@
 # embedder.py
-import pickle, numpy as np, faiss
-from sentence_transformers import SentenceTransformer
-
-MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-EMB_PATH   = "docs_index.faiss"
-
-# 1. Load metadata
-with open("docs_metadata.pkl", "rb") as f:
-    chunks = pickle.load(f)
-
-# 2. Compute embeddings
-model  = SentenceTransformer(MODEL_NAME)
-texts  = [c["text"] for c in chunks]
-embs   = model.encode(texts, show_progress_bar=True, convert_to_numpy=True)
-
-# 3. Build FAISS index
-dim    = embs.shape[1]
-index  = faiss.IndexFlatIP(dim)   # inner-product for cosine if vectors are normalized
-faiss.normalize_L2(embs)
-index.add(embs)
-
-# 4. Save index
-faiss.write_index(index, EMB_PATH)
-print("→ Saved FAISS index with", index.ntotal, "vectors")
+"""
+Embed the chunk store into the FAISS index. From the repo root:
+    python -m rag.embedder [--full] [--index-type ivf]
+or as a script, e.g. from rag/: python embedder.py
+"""
+from pathlib import Path
+import hashlib, json, sys, numpy as np, faiss
+import typer
+
+if __package__ in (None, ""):       # run as a script: make the rag package importable
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from rag import ann
+from rag.chunk_store import ChunkStore
+from rag.embedding import MODEL_NAME, get_embedder
+from rag.paths import STORE_PATH, INDEX_PATH, VEC_PATH, PROGRESS_PATH
+
+app = typer.Typer()
+
+
+def load_id_index(dim: int):
+    """
+    Open the saved index for in-place updates.
+    @return - IndexIDMap2, or None when there is no ID-mapped index to update
+    """
+    if not INDEX_PATH.exists():
+        return None
+    index = faiss.read_index(str(INDEX_PATH))
+    if not isinstance(index, faiss.IndexIDMap2) or index.d != dim:
+        return None
+    return index
+
+
+def encode(model, texts, batch_size: int = 32) -> np.ndarray:
+    embs = model.encode(texts, batch_size=batch_size, convert_to_numpy=True).astype("float32")
+    faiss.normalize_L2(embs)    # inner-product for cosine once vectors are normalized
+    return embs
+
+
+def open_vectors(todo_ids: np.ndarray, dim: int, dtype: str):
+    """
+    Open the memory-mapped staging array for this run.
+    A previous run over the same IDs/dtype is resumed from its last finished batch.
+    @return - (vectors memmap, progress state); state["done"] is the rows already encoded
+    """
+    digest = hashlib.sha256(todo_ids.tobytes()).hexdigest()
+    state  = {"ids": digest, "dtype": dtype, "dim": dim, "done": 0}
+    if PROGRESS_PATH.exists() and VEC_PATH.exists():
+        with open(PROGRESS_PATH, "r", encoding="utf-8") as f:
+            prev = json.load(f)
+        if {k: prev.get(k) for k in ("ids", "dtype", "dim")} == {k: state[k] for k in ("ids", "dtype", "dim")}:
+            return np.load(VEC_PATH, mmap_mode="r+"), prev
+    vecs = np.lib.format.open_memmap(VEC_PATH, mode="w+", dtype=dtype, shape=(len(todo_ids), dim))
+    save_progress(state)
+    return vecs, state
+
+
+def save_progress(state: dict):
+    tmp = PROGRESS_PATH.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    tmp.replace(PROGRESS_PATH)
+
+
+def embed_stream(model, store: ChunkStore, todo: np.ndarray, batch_size: int, dtype: str) -> np.memmap:
+    """
+    Encode the `todo` chunk IDs batch by batch into the on-disk vector array,
+    reading only each batch's texts from the chunk store.
+    Progress is checkpointed after every batch, so only one batch is ever held in RAM
+    and an interrupted run picks up where it stopped.
+    """
+    dim = model.get_sentence_embedding_dimension()
+    vecs, state = open_vectors(todo, dim, dtype)
+    if state["done"]:
+        print(f"→ Resuming at chunk {state['done']}/{len(todo)}")
+    for start in range(state["done"], len(todo), batch_size):
+        rows = todo[start:start + batch_size]
+        vecs[start:start + len(rows)] = encode(model, store.texts(rows), batch_size)
+        vecs.flush()
+        state["done"] = start + len(rows)
+        save_progress(state)
+        print(f"→ Encoded {state['done']}/{len(todo)}")
+    return vecs
+
+
+def add_stream(index, vecs: np.ndarray, vec_ids: np.ndarray, batch_size: int):
+    """Add vectors from the memmap to the index one batch at a time."""
+    for start in range(0, len(vec_ids), batch_size):
+        index.add_with_ids(np.ascontiguousarray(vecs[start:start + batch_size], dtype="float32"),
+                           vec_ids[start:start + batch_size])
+
+
+@app.command()
+def main(
+        full: bool = typer.Option(False, "--full", help="Re-embed every chunk instead of reconciling the saved index"),
+        batch_size: int = typer.Option(256, "--batch-size", help="Chunks encoded and added per batch"),
+        float16: bool = typer.Option(False, "--float16", help="Stage vectors on disk as float16"),
+        index_type: str = typer.Option(None, "--index-type", help=f"One of {', '.join(ann.INDEX_TYPES)}; default keeps the saved index's type"),
+        nlist: int = typer.Option(0, "--nlist", help="IVF inverted lists, 0 picks one from the corpus size")
+    ):
+    """Embed the chunk store into docs_index.faiss, touching only added/removed chunk IDs."""
+    # 1. Open the chunk store; only the live ID list is loaded up front
+    store = ChunkStore(STORE_PATH)
+    ids   = store.ids()
+
+    model = get_embedder(MODEL_NAME)     # shared service if running, else in-process
+    dim   = model.get_sentence_embedding_dimension()
+
+    # 2. Reconcile the ID-mapped index with the metadata
+    index = None if full else load_id_index(dim)
+    if index is not None:
+        indexed = faiss.vector_to_array(index.id_map)
+        stale   = np.setdiff1d(indexed, ids)
+        if index_type and index_type != ann.index_kind(index):
+            print(f"→ Switching index type to {index_type}, rebuilding")
+            index = None
+        elif len(stale) and ann.index_kind(index) == "hnsw":
+            print("→ HNSW cannot remove vectors, rebuilding")
+            index = None
+    if index is None:
+        index = ann.make_index(index_type or "flat", dim, len(ids), nlist)
+        todo  = ids
+    else:
+        if len(stale):
+            index.remove_ids(stale)
+        todo = ids[~np.isin(ids, indexed)]
+        print(f"→ Removed {len(stale)} stale vectors")
+
+    # 3. Stream embeddings for new chunks only through the on-disk array,
+    #    training IVF indexes on a sample of it before adding
+    if len(todo):
+        vecs = embed_stream(model, store, todo, batch_size, "float16" if float16 else "float32")
+        ann.train(index, vecs)
+        add_stream(index, vecs, todo, batch_size)
+        del vecs
+    print(f"→ Embedded {len(todo)} new chunks")
+
+    # 4. Save index (atomically: servers keep the old file memory-mapped), then drop the staging files
+    tmp = INDEX_PATH.with_suffix(".tmp")
+    faiss.write_index(index, str(tmp))
+    tmp.replace(INDEX_PATH)
+    PROGRESS_PATH.unlink(missing_ok=True)
+    VEC_PATH.unlink(missing_ok=True)
+    print(f"→ Saved {ann.index_kind(index)} FAISS index with", index.ntotal, "vectors")
+
+
+if __name__ == "__main__":
+    app()
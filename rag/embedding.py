@@ -0,0 +1,111 @@
+# embedding.py
+"""
+Pluggable embedders.
+Both implementations expose the slice of the SentenceTransformer API the RAG code uses
+(`encode(texts, batch_size=..., convert_to_numpy=True)` and
+`get_sentence_embedding_dimension()`), so either can be dropped in for the other.
+- LocalEmbedder  : loads the model in this process
+- RemoteEmbedder : forwards to the shared embedding service (python -m rag.embed_service)
+get_embedder() picks the service when one is running and falls back to in-process;
+RemoteEmbedder also falls back per call if the service stops answering later.
+"""
+from typing import List, Protocol
+import os, sys, threading, time
+import numpy as np
+import requests
+
+MODEL_NAME  = "sentence-transformers/all-MiniLM-L6-v2"
+SERVICE_URL = os.environ.get("RAG_EMBED_URL", "http://127.0.0.1:8765")
+
+
+class Embedder(Protocol):
+    def encode(self, texts: List[str], batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray: ...
+    def get_sentence_embedding_dimension(self) -> int: ...
+
+
+class LocalEmbedder:
+    def __init__(self, model_name: str = MODEL_NAME):
+        # imported here so processes using the service never pay for torch
+        from sentence_transformers import SentenceTransformer
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts, batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        kwargs.pop("show_progress_bar", None)
+        return self.model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True, **kwargs).astype("float32")
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+
+class RemoteEmbedder:
+    """
+    Client of the shared service. A busy service (503) is waited for, honouring Retry-After.
+    If the service goes away mid-run, calls fall back to a local copy of the same model
+    (loaded on first failure) and the service is retried every RETRY_S.
+    """
+    RETRY_S   = 30.0
+    BACKOFF_S = (0.05, 2.0)         # first and longest wait between busy retries
+
+    def __init__(self, url: str = SERVICE_URL, timeout: float = 60.0):
+        self.url     = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        info = self.session.get(f"{self.url}/health", timeout=1.0).json()
+        self.model_name = info["model"]
+        self.dim        = info["dim"]
+        self._local     = None
+        self._local_lock = threading.Lock()
+        self._retry_at  = 0.0
+
+    def encode(self, texts, batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.dim), dtype="float32")
+        if time.monotonic() >= self._retry_at:
+            try:
+                return self._post(texts)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._retry_at = time.monotonic() + self.RETRY_S
+                print(f"→ Embedding service unreachable ({e}); encoding locally", file=sys.stderr)
+        return self._local_model().encode(texts, batch_size=batch_size, **kwargs)
+
+    def _post(self, texts: List[str]) -> np.ndarray:
+        delay, deadline = self.BACKOFF_S[0], time.monotonic() + self.timeout
+        while True:
+            response = self.session.post(f"{self.url}/encode", json={"texts": texts}, timeout=self.timeout)
+            if response.status_code != 503 or time.monotonic() >= deadline:
+                response.raise_for_status()
+                return np.frombuffer(response.content, dtype="<f4").reshape(len(texts), self.dim).copy()
+            # busy, not gone: wait for it rather than loading another copy of the model
+            try:
+                wait = float(response.headers.get("Retry-After", delay))
+            except ValueError:
+                wait = delay
+            time.sleep(max(0.0, min(wait, deadline - time.monotonic())))
+            delay = min(2 * delay, self.BACKOFF_S[1])
+
+    def _local_model(self) -> "LocalEmbedder":
+        # encode runs on several threads at once; load the fallback model only once
+        with self._local_lock:
+            if self._local is None:
+                self._local = LocalEmbedder(self.model_name)
+            return self._local
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+
+def get_embedder(model_name: str = MODEL_NAME, url: str | None = None) -> Embedder:
+    """
+    The shared service if one is reachable and serves `model_name`, else a local model.
+    @param: url - OPTIONAL; service URL, defaults to $RAG_EMBED_URL or http://127.0.0.1:8765
+    """
+    try:
+        remote = RemoteEmbedder(url or SERVICE_URL)
+        if remote.model_name == model_name:
+            return remote
+        print(f"→ Embedding service serves {remote.model_name}, not {model_name}; loading locally", file=sys.stderr)
+    except (requests.RequestException, ValueError, KeyError):
+        pass
+    return LocalEmbedder(model_name)
@@ -1,29 +1,209 @@
 # indexer.py
+"""
+Chunk the vault into the chunk store. From the repo root:
+    python -m rag.indexer --data-dir <vault> [--full]
+or as a script, e.g. from rag/: python indexer.py --data-dir <vault>
+"""
 from pathlib import Path
-from langchain_community.document_loaders import TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-import pickle
-
-DATA_DIR   = Path(r"C:\Users\nchur\Documents\second-brain\$school")          # your PDF/MD folder
-META_PATH  = "docs_metadata.pkl"
-CHUNKS_KEY = "chunks"
-
-# 1. Load + chunk
-all_chunks = []
-splitter   = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-for f in DATA_DIR.rglob("*.*"):     # .md, .pdf, etc.
-    loader = TextLoader(str(f), autodetect_encoding=True)
-    docs   = loader.load()
+from concurrent.futures import ProcessPoolExecutor
+from langchain_community.document_loaders import TextLoader, PyPDFLoader
+from langchain.text_splitter import RecursiveCharacterTextSplitter, Language
+import hashlib, json, os, pickle, sys
+import typer
+
+if __package__ in (None, ""):       # run as a script: make the rag package importable
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from rag.chunk_store import ChunkStore, migrate_pickle
+from rag.paths import DATA_DIR, STORE_PATH, META_PATH, MANIFEST_PATH
+
+app = typer.Typer()
+splitter    = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+md_splitter = RecursiveCharacterTextSplitter.from_language(Language.MARKDOWN, chunk_size=500, chunk_overlap=50)
+
+# — File types —
+MD_EXTS   = {".md", ".markdown"}
+PDF_EXTS  = {".pdf"}
+TEXT_EXTS = {".txt", ".rst", ".org", ".tex", ".csv", ".json", ".yaml", ".yml", ".canvas", ".html", ".py"}
+SKIP_EXTS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".bmp", ".ico", ".mp3", ".mp4", ".mov", ".wav",
+             ".zip", ".gz", ".tar", ".7z", ".exe", ".dll", ".so", ".bin", ".pkl", ".faiss", ".docx", ".xlsx", ".pptx"}
+BINARY_MAGIC = (b"\x89PNG", b"\xff\xd8\xff", b"GIF8", b"PK\x03\x04", b"\x7fELF", b"MZ", b"RIFF", b"\x1f\x8b")
+SNIFF_BYTES  = 8192
+
+
+def classify(path: Path) -> str | None:
+    """
+    Pick a loader for a file from its extension, falling back to magic bytes.
+    @return - "markdown", "pdf", "text", or None for files that should be skipped
+    """
+    ext = path.suffix.lower()
+    if ext in SKIP_EXTS:
+        return None
+    if ext in MD_EXTS:
+        return "markdown"
+    if ext in PDF_EXTS:
+        return "pdf"
+    if ext in TEXT_EXTS:
+        return "text"
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    if head.startswith(BINARY_MAGIC) or b"\x00" in head:
+        return None
+    return "text"
+
+
+def file_hash(path: Path) -> str:
+    """sha256 of a file's bytes, read in 1 MiB blocks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_manifest() -> dict:
+    """
+    Manifest of the last indexing run.
+    @return - {"next_id": int, "files": {source: {"sha256", "mtime", "size", "chunks"}}}
+    """
+    if not MANIFEST_PATH.exists():
+        return {"next_id": 0, "files": {}}
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def legacy_next_id(pkl_path: Path = META_PATH) -> int:
+    """First ID after those of a legacy docs_metadata.pkl (positional when chunks have none), else 0."""
+    if not pkl_path.exists():
+        return 0
+    with open(pkl_path, "rb") as f:
+        chunks = pickle.load(f)
+    return max((c.get("id", n) for n, c in enumerate(chunks)), default=-1) + 1
+
+
+def save_manifest(manifest: dict):
+    tmp = MANIFEST_PATH.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    tmp.replace(MANIFEST_PATH)
+
+
+def scan(data_dir: Path, previous: dict):
+    """
+    Walk the vault and diff it against the previous manifest.
+    Files whose mtime and size are unchanged are trusted without hashing.
+    Unreadable types are recorded with kind None so they are sniffed only once.
+    @return - (files, added, changed, deleted); files is the new manifest "files" entry
+    """
+    files, added, changed = {}, [], []
+    for f in sorted(data_dir.rglob("*.*")):     # .md, .pdf, etc.
+        if not f.is_file():
+            continue
+        source = str(f)
+        st     = f.stat()
+        old    = previous.get(source)
+        if old and old["mtime"] == st.st_mtime and old["size"] == st.st_size:
+            files[source] = old
+            continue
+        digest = file_hash(f)
+        files[source] = {"sha256": digest, "mtime": st.st_mtime, "size": st.st_size,
+                         "kind": classify(f), "chunks": 0}
+        if old is None:
+            added.append(source)
+        elif old["sha256"] != digest:
+            changed.append(source)
+        else:
+            # touched but identical content: keep the old chunk count
+            files[source]["chunks"] = old["chunks"]
+    deleted = [s for s in previous if s not in files]
+    return files, added, changed, deleted
+
+
+def chunk_file(source: str, kind: str) -> list:
+    """
+    Load one file with the loader for its kind and split it into chunk texts.
+    Runs inside the worker processes, so failures are reported rather than raised.
+    """
+    try:
+        if kind == "pdf":
+            docs, split = PyPDFLoader(source).load(), splitter
+        else:
+            docs  = TextLoader(source, autodetect_encoding=True).load()
+            split = md_splitter if kind == "markdown" else splitter
+    except Exception as e:
+        print(f"→ Skipping {source}: {e}")
+        return []
+    texts = []
     for doc in docs:
-        texts = splitter.split_text(doc.page_content)
-        for i, t in enumerate(texts):
-            all_chunks.append({
-                "text":   t,
-                "source": str(f),
-                "idx":    i
-            })
-
-# 2. Persist metadata (we’ll add embeddings separately)
-with open(META_PATH, "wb") as f:
-    pickle.dump(all_chunks, f)
-print(f"→ Prepared {len(all_chunks)} chunks")
+        texts.extend(split.split_text(doc.page_content))
+    return texts
+
+
+def chunk_all(sources, kinds, workers: int):
+    """
+    Chunk files across a process pool.
+    executor.map yields results in input order, so output is deterministic.
+    """
+    if workers <= 1 or len(sources) < 2:
+        return [chunk_file(s, k) for s, k in zip(sources, kinds)]
+    workers = min(workers, len(sources))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(chunk_file, sources, kinds, chunksize=max(1, len(sources) // (workers * 4))))
+
+
+def chunk_sources(sources, files: dict, workers: int = 1):
+    """
+    Chunk each readable source, in sorted order.
+    @return - list of (source, texts), ready for ChunkStore.append
+    """
+    sources = sorted(s for s in sources if files[s].get("kind"))
+    kinds   = [files[s]["kind"] for s in sources]
+    out = list(zip(sources, chunk_all(sources, kinds, workers)))
+    for source, texts in out:
+        files[source]["chunks"] = len(texts)
+    return out
+
+
+@app.command()
+def main(
+        full: bool = typer.Option(False, "--full", help="Re-chunk the whole vault instead of only changed files"),
+        workers: int = typer.Option(os.cpu_count() or 1, "--workers", help="Chunking processes"),
+        data_dir: Path = typer.Option(DATA_DIR, "--data-dir", help="Vault to index (default $RAG_DATA_DIR)")
+    ):
+    """Chunk the vault into the chunk store, incrementally when a manifest exists."""
+    if data_dir is None:
+        raise typer.BadParameter("no vault to index; pass --data-dir or set RAG_DATA_DIR", param_hint="--data-dir")
+    manifest = load_manifest()
+    if not full and not ChunkStore.exists(STORE_PATH) and META_PATH.exists() and manifest["files"]:
+        # one-time move off docs_metadata.pkl, keeping its vector IDs
+        migrate_pickle(META_PATH, STORE_PATH)
+    if full or not ChunkStore.exists(STORE_PATH) or not manifest["files"]:
+        # IDs stay monotonic across full rebuilds so old vectors never alias new chunks; without a
+        # manifest that includes the legacy pickle's IDs, which the saved index may still hold
+        base     = max(ChunkStore(STORE_PATH).next_id if ChunkStore.exists(STORE_PATH) else 0,
+                       manifest.get("next_id", 0), legacy_next_id())
+        store    = ChunkStore.create(STORE_PATH, base)
+        previous = {}
+    else:
+        store    = ChunkStore(STORE_PATH)
+        previous = manifest["files"]
+
+    # 1. Diff the vault against the manifest
+    files, added, changed, deleted = scan(data_dir, previous)
+    print(f"→ {len(added)} added, {len(changed)} changed, {len(deleted)} deleted")
+
+    # 2. Tombstone chunks of changed/deleted files, append chunks of added/changed ones.
+    #    "added" files can already have chunks when a run died after append but before the
+    #    manifest was saved; tombstoning them too keeps a rerun from indexing them twice.
+    removed = store.delete_sources(added + changed + deleted)
+    new     = chunk_sources(added + changed, files, workers)
+    store.append(new)
+
+    # 3. Persist the manifest (we’ll add embeddings separately)
+    save_manifest({"next_id": store.next_id, "files": files})
+    print(f"→ Prepared {len(store)} chunks ({sum(len(t) for _, t in new)} new, {removed} removed)")
+
+
+if __name__ == "__main__":
+    app()
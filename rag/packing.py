@@ -0,0 +1,118 @@
+# packing.py
+"""
+Context packing for get_context.
+1. dedupe   : a (source, idx) chunk is kept only for the first topic that retrieved it
+2. mmr      : OPTIONAL; maximal-marginal-relevance rerank for diversity within a topic
+3. merge    : adjacent chunks of one file become one span, with the splitter overlap removed
+4. budget   : spans are taken round-robin by rank across topics until the token budget is spent
+"""
+import math
+import numpy as np
+
+CHUNK_OVERLAP = 50          # matches the indexer's splitter
+CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English with MiniLM/GPT-style tokenizers)."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def dedupe(per_topic: list) -> list:
+    """Drop chunks already returned for an earlier topic."""
+    seen, out = set(), []
+    for hits in per_topic:
+        kept = []
+        for h in hits:
+            key = (h["source"], h["idx"])
+            if key not in seen:
+                seen.add(key)
+                kept.append(h)
+        out.append(kept)
+    return out
+
+
+def mmr(hits: list, hit_vecs: np.ndarray, query_vec: np.ndarray, k: int, lambda_: float = 0.5) -> list:
+    """
+    Select k hits trading relevance to the query against similarity to hits already chosen.
+    Vectors are L2-normalized, so dot products are cosine similarities.
+    """
+    if len(hits) <= 1:
+        return hits[:k]
+    relevance = hit_vecs @ query_vec
+    pairwise  = hit_vecs @ hit_vecs.T
+    chosen, rest = [], list(range(len(hits)))
+    while rest and len(chosen) < k:
+        if chosen:
+            redundancy = pairwise[np.ix_(rest, chosen)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(rest))
+        best = rest[int(np.argmax(lambda_ * relevance[rest] - (1 - lambda_) * redundancy))]
+        chosen.append(best)
+        rest.remove(best)
+    return [hits[i] for i in chosen]
+
+
+def join_overlapping(left: str, right: str, max_overlap: int = 2 * CHUNK_OVERLAP, min_overlap: int = 8) -> str:
+    """
+    Concatenate two consecutive chunks, dropping the longest suffix of `left` that starts `right`.
+    Overlaps shorter than `min_overlap` are treated as coincidence, not splitter overlap.
+    """
+    for n in range(min(max_overlap, len(left), len(right)), min_overlap - 1, -1):
+        if left.endswith(right[:n]):
+            return left + right[n:]
+    return left + "\n" + right
+
+
+def merge_adjacent(hits: list) -> list:
+    """
+    Merge runs of consecutive chunk indexes from the same file into spans.
+    Spans keep the rank of their best chunk.
+    @return - spans {"source", "start", "end", "text", "score"}, best first
+    """
+    by_source = {}
+    for rank, h in enumerate(hits):
+        by_source.setdefault(h["source"], []).append((h, rank))
+    spans = []
+    for source, group in by_source.items():
+        group.sort(key=lambda p: p[0]["idx"])
+        span = None
+        for h, rank in group:
+            if span and h["idx"] == span["end"] + 1:
+                span["text"]  = join_overlapping(span["text"], h["text"])
+                span["end"]   = h["idx"]
+                span["score"] = max(span["score"], h.get("score", 0.0))
+                span["rank"]  = min(span["rank"], rank)
+                continue
+            span = {"source": source, "start": h["idx"], "end": h["idx"], "text": h["text"],
+                    "score": h.get("score", 0.0), "rank": rank}
+            spans.append(span)
+    spans.sort(key=lambda s: s["rank"])
+    return spans
+
+
+def within_budget(per_topic_spans: list, token_budget: int | None) -> list:
+    """Take spans round-robin by rank across topics while they fit in the budget."""
+    if token_budget is None:
+        return per_topic_spans
+    out   = [[] for _ in per_topic_spans]
+    spent = 0
+    for rank in range(max((len(s) for s in per_topic_spans), default=0)):
+        for t, spans in enumerate(per_topic_spans):
+            if rank < len(spans):
+                cost = count_tokens(spans[rank]["text"])
+                if spent + cost <= token_budget:
+                    out[t].append(spans[rank])
+                    spent += cost
+    return out
+
+
+def span_label(span: dict) -> str:
+    if span["start"] == span["end"]:
+        return f"[{span['source']}#{span['start']}]"
+    return f"[{span['source']}#{span['start']}-{span['end']}]"
+
+
+def pack(per_topic: list, token_budget: int | None = None) -> list:
+    """Dedupe, merge and budget already-ranked hits. @return - per topic, a list of spans"""
+    return within_budget([merge_adjacent(h) for h in dedupe(per_topic)], token_budget)
@@ -0,0 +1,22 @@
+# paths.py
+"""
+Where the RAG pipeline keeps its files, shared by the indexer, the embedder and mcp_files.
+Each can be moved with an environment variable (read at import time):
+- DATA_DIR      : $RAG_DATA_DIR, the vault to index; no default, the indexer also takes --data-dir
+- STORE_PATH    : $RAG_STORE_PATH, chunk store docs_chunks.{txt,idx,json}
+- MANIFEST_PATH : $RAG_MANIFEST_PATH, per-file hashes for incremental indexing
+- META_PATH     : $RAG_META_PATH, legacy docs_metadata.pkl next to the chunk store, migrated on first run
+- INDEX_PATH    : $RAG_INDEX_PATH, the FAISS index
+- VEC_PATH, PROGRESS_PATH : the embedder's resumable staging files, next to the index
+"""
+from pathlib import Path
+import os
+
+RAG_DIR       = Path(__file__).resolve().parent
+DATA_DIR      = Path(os.environ["RAG_DATA_DIR"]) if os.environ.get("RAG_DATA_DIR") else None
+STORE_PATH    = Path(os.environ.get("RAG_STORE_PATH", RAG_DIR / "docs_chunks"))
+MANIFEST_PATH = Path(os.environ.get("RAG_MANIFEST_PATH", RAG_DIR / "docs_manifest.json"))
+META_PATH     = Path(os.environ.get("RAG_META_PATH", STORE_PATH.parent / "docs_metadata.pkl"))
+INDEX_PATH    = Path(os.environ.get("RAG_INDEX_PATH", RAG_DIR / "docs_index.faiss"))
+VEC_PATH      = INDEX_PATH.parent / "docs_vectors.npy"
+PROGRESS_PATH = INDEX_PATH.parent / "docs_vectors.progress.json"
@@ -1,67 +1,215 @@
 """
 MCP server for managing blog posts.
 - Resource : blog posts in a SQL database.
-- Tool : list_posts, get_post, create_post
+- Tool : list_posts, get_post, create_post, update_post(s), delete_posts, search_posts, list_tags, list_posts_by_tag
 """
 from mcp.server.fastmcp import FastMCP, Context
 from pydantic import BaseModel, Field
 from typing import TypedDict, List
-import requests
-import markdown2
-import re
+import asyncio
+import httpx
+import os
+import random
+import time
+from tracing.spans import Tracer
 
-SERVER_URL = "http://localhost:5000"
+SERVER_URL      = os.environ.get("BLOG_URL", "http://localhost:5000")
+TIMEOUT         = float(os.environ.get("BLOG_TIMEOUT", 10.0))        # seconds per read/write
+CONNECT_TIMEOUT = float(os.environ.get("BLOG_CONNECT_TIMEOUT", 2.0))
+MAX_RETRIES     = int(os.environ.get("BLOG_MAX_RETRIES", 3))
+BACKOFF         = float(os.environ.get("BLOG_BACKOFF", 0.2))         # first retry delay, doubles each time
+MAX_CONCURRENCY = int(os.environ.get("BLOG_MAX_CONCURRENCY", 8))
+IDEMPOTENT      = {"GET", "HEAD", "PUT", "DELETE"}
+RETRY_STATUS    = {502, 503, 504}
+MAX_BULK        = 1000          # items (or ids in a range) per /posts/bulk call, as in blog/server.py
 
 mcp = FastMCP("Blog Server", version="0.1.0")
+tracer = Tracer("mcp_blog")
+
+
+class BlogClient:
+    """
+    One pooled keep-alive connection set to the blog server, shared by every tool.
+    - at most MAX_CONCURRENCY requests in flight
+    - retries with jittered exponential backoff: idempotent methods on timeouts, transport
+      errors and 502/503/504; POST/PATCH only when the connection was never made
+    - each call's latency and attempt count is logged through the tool's ctx, and traced as an
+      "http" span that also carries the server's own Server-Timing (e.g. markdown render time)
+    """
+    def __init__(self, base_url: str = SERVER_URL):
+        self.base_url = base_url
+        self._client = None
+        self._limit  = None
+
+    def _ensure(self) -> httpx.AsyncClient:
+        # created on first use, inside the server's event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(TIMEOUT, connect=CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=MAX_CONCURRENCY, max_keepalive_connections=MAX_CONCURRENCY)
+            )
+            self._limit = asyncio.Semaphore(MAX_CONCURRENCY)
+        return self._client
+
+    async def request(self, ctx: Context | None, method: str, path: str, **kwargs) -> httpx.Response:
+        with tracer.span("http", method=method, path=path) as span:
+            response = await self._request(ctx, method, path, **kwargs)
+            span.set(status=response.status_code, server_timing=response.headers.get("Server-Timing"))
+            return response
+
+    async def _request(self, ctx: Context | None, method: str, path: str, **kwargs) -> httpx.Response:
+        client = self._ensure()
+        start  = time.perf_counter()
+        for attempt in range(MAX_RETRIES + 1):
+            error = response = None
+            try:
+                async with self._limit:
+                    response = await client.request(method, path, **kwargs)
+                retry = method in IDEMPOTENT and response.status_code in RETRY_STATUS
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                error, retry = e, True      # nothing reached the server
+            except httpx.TransportError as e:
+                error, retry = e, method in IDEMPOTENT
+            if not retry or attempt == MAX_RETRIES:
+                break
+            await asyncio.sleep(BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5))
+
+        elapsed = (time.perf_counter() - start) * 1000
+        outcome = response.status_code if response is not None else type(error).__name__
+        if ctx is not None:
+            await ctx.info(f"blog {method} {path} -> {outcome} in {elapsed:.0f} ms ({attempt + 1} attempt(s))")
+        if error is not None:
+            raise error
+        return response
+
+    async def get(self, ctx, path, **kwargs):
+        return await self.request(ctx, "GET", path, **kwargs)
+
+    async def post(self, ctx, path, **kwargs):
+        return await self.request(ctx, "POST", path, **kwargs)
+
+    async def put(self, ctx, path, **kwargs):
+        return await self.request(ctx, "PUT", path, **kwargs)
+
+    async def patch(self, ctx, path, **kwargs):
+        return await self.request(ctx, "PATCH", path, **kwargs)
+
+    async def delete(self, ctx, path, **kwargs):
+        return await self.request(ctx, "DELETE", path, **kwargs)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+blog = BlogClient()
 
 class BlogPost(BaseModel):
     id: int = Field(description="Primary Key of the BlogPost.")
     content: str = Field(description="The HTML string of the blog post's content.")
+    markdown: str | None = Field(default=None, description="Markdown source of the content; None for posts written as HTML.")
     title: str = Field(description="The title of the blog post.")
     tags: List[str] = Field(description="Comma-separated tags for the blog post.")
 
+class PostSummary(BaseModel):
+    id: int = Field(description="Primary Key of the BlogPost.")
+    title: str = Field(description="The title of the blog post.")
+    tags: List[str] = Field(description="Tags for the blog post.")
+
+JSON = {"Accept": "application/json"}
+
+def expect_ok(response: httpx.Response, what: str) -> httpx.Response:
+    """Typed tools raise rather than return a message the caller's schema doesn't allow."""
+    if response.status_code == 404:
+        raise ValueError(f"Error {what}: not found")
+    if not response.is_success:
+        raise ValueError(f"Error {what}: {response.status_code}")
+    return response
 
 @mcp.tool()
-def list_posts() -> List[BlogPost]:
+@tracer.tool
+async def list_posts(ctx: Context, limit: int = 20, after_id: int | None = None, newest_first: bool = True) -> List[PostSummary]:
+    """
+    List blog posts one page at a time, without their content (use get_post for that).
+    @param: limit - OPTIONAL; posts per page
+    @param: after_id - OPTIONAL; id of the last post of the previous page
+    @param: newest_first - OPTIONAL; order by id descending (default) or ascending
+    @return - List of PostSummary (id, title, tags)
     """
-    List all blog posts.
+    params = {"fields": "id,title,tags", "limit": limit, "order": "desc" if newest_first else "asc"}
+    if after_id is not None:
+        params["after_id"] = after_id
+    response = expect_ok(await blog.get(ctx, "/posts", params=params), "listing posts")
+    return [PostSummary(**post) for post in response.json()]
+
+class TagCount(BaseModel):
+    name: str = Field(description="Tag name (lowercase).")
+    count: int = Field(description="Number of posts with this tag.")
+
+@mcp.tool()
+@tracer.tool
+async def list_tags(ctx: Context) -> List[TagCount]:
+    """
+    List every tag in use with its post count, most used first.
     @param: None
-    @return - List of each BlogPost
+    @return - List of TagCount (name, count)
+    """
+    response = expect_ok(await blog.get(ctx, "/tags"), "listing tags")
+    return [TagCount(**tag) for tag in response.json()]
+
+@mcp.tool()
+@tracer.tool
+async def list_posts_by_tag(
+        ctx: Context,
+        tags: List[str],
+        limit: int = 20,
+        after_id: int | None = None,
+        newest_first: bool = True
+    ) -> List[PostSummary]:
+    """
+    List posts on a topic: posts carrying ALL of the given tags, one page at a time.
+    @param: tags - tag names (case-insensitive); see list_tags
+    @param: limit - OPTIONAL; posts per page
+    @param: after_id - OPTIONAL; id of the last post of the previous page
+    @param: newest_first - OPTIONAL; order by id descending (default) or ascending
+    @return - List of PostSummary (id, title, tags)
     """
-    response = requests.get(f"{SERVER_URL}/posts")
-    if response.status_code == 200:
-        response = response.json()
-        return [BlogPost(**post) for post in response]
-    return []
+    params = {"fields": "id,title,tags", "limit": limit, "order": "desc" if newest_first else "asc", "tag": tags}
+    if after_id is not None:
+        params["after_id"] = after_id
+    response = expect_ok(await blog.get(ctx, "/posts", params=params), "listing posts")
+    return [PostSummary(**post) for post in response.json()]
 
 @mcp.tool()
-def get_post(post_id: int) -> BlogPost:
+@tracer.tool
+async def get_post(post_id: int, ctx: Context) -> BlogPost:
     """
     Get a specific blog post by ID.
     @param: post_id - the primary key of the BlogPost
     @return - json of BlogPost
     """
-    response = requests.get(f"{SERVER_URL}/posts/{post_id}")
-    if response.status_code == 200:
-        return response.json()
-    return "Error fetching post."
+    response = await blog.get(ctx, f"/posts/{post_id}", headers=JSON,
+                              params={"fields": "id,title,content,markdown,tags"})
+    return BlogPost(**expect_ok(response, f"fetching post {post_id}").json())
 
 @mcp.tool()
-def get_most_recent_post_id() -> int:
+@tracer.tool
+async def get_most_recent_post_id(ctx: Context) -> str:
     """
     Returns the ID of the most recently created BlogPost
     @param: None
     @return - id or failure message
     """
-    response = requests.get(f"{SERVER_URL}/posts")
-    if response.ok:
-        response = response.json()
-        key, post = response.popitem()  # pops the last inserted pair
-        return f"The most recent BlogPost id = {post.id}"
+    response = await blog.get(ctx, "/posts/latest", params={"fields": "id"})
+    if response.is_success:
+        return f"The most recent BlogPost id = {response.json()['id']}"
     return "Error fetching post."
 
 @mcp.tool()
-def update_post(
+@tracer.tool
+async def update_post(
+        ctx: Context,
         id: int, 
         title: str | None = None,
         content: str | None = None,
@@ -71,33 +219,88 @@ def update_post(
     Update a specific BlogPost.
     @param: id - BlogPost to be updated
     @param: title - OPTIONAL; new title for the BlogPost
-    @param: content - OPTIONAL; new content for the BlogPost
+    @param: content - OPTIONAL; new body for the BlogPost, as markdown
     @param: tags - OPTIONAL; new tag list for the BlogPost
     @return - success/failure message 
     """
-    response = requests.get(f"{SERVER_URL}/posts/{id}")
-    if response.ok:
-        response = requests.put(f"{SERVER_URL}/posts/{id}", json={
-            "title": title,
-            "content": content,
-            "tags": tags
-        })
-        if response.ok:
-            return f"Successfully updated post {id}"
+    response = await blog.put(ctx, f"/posts/{id}", json={
+        "title": title,
+        "markdown": content,
+        "tags": tags
+    })
+    if response.is_success:
+        return f"Successfully updated post {id}"
+    if response.status_code == 404:
+        return f"Post {id} does not exist."
     return f"Error updating post with {id}"
 
+class PostUpdate(BaseModel):
+    id: int = Field(description="Primary Key of the BlogPost to update.")
+    title: str | None = Field(default=None, description="New title.")
+    content: str | None = Field(default=None, description="New body, as markdown.")
+    tags: List[str] | None = Field(default=None, description="New tag list.")
+
+def bulk_summary(verb: str, response: httpx.Response) -> str:
+    """One line per outcome of a /posts/bulk call."""
+    if not response.is_success:
+        return f"Error {verb} posts: {response.status_code}"
+    results = response.json()["results"]
+    done    = [r["id"] for r in results if r["status"] < 300]
+    missing = [r["id"] for r in results if r["status"] == 404]
+    invalid = [f"#{r['index']}: {r['error']}" for r in results if r["status"] == 400]
+    lines = [f"Successfully {verb} {len(done)} post(s): {done}"]
+    if missing:
+        lines.append(f"Not found: {missing}")
+    if invalid:
+        lines.append(f"Invalid: {'; '.join(invalid)}")
+    return "\n".join(lines)
+
+@mcp.tool()
+@tracer.tool
+async def update_posts(updates: List[PostUpdate], ctx: Context) -> str:
+    """
+    Update several BlogPosts in one call; omitted fields are left unchanged.
+    @param: updates - list of PostUpdate (id plus any of title, content, tags)
+    @return - which posts were updated, not found or invalid
+    """
+    response = await blog.patch(ctx, "/posts/bulk", json={
+        "posts": [{("markdown" if k == "content" else k): v for k, v in u.model_dump(exclude_none=True).items()}
+                  for u in updates]
+    })
+    return bulk_summary("updated", response)
+
+class SearchHit(BaseModel):
+    id: int = Field(description="Primary Key of the BlogPost.")
+    title: str = Field(description="The title of the blog post.")
+    snippet: str = Field(description="Matching excerpt of the content, matches wrapped in [ ].")
+    score: float = Field(description="Relevance, higher is better.")
+
 @mcp.tool()
-def list_keyword_post_ids(query: str) -> List[int]:
+@tracer.tool
+async def list_keyword_post_ids(ctx: Context, query: str, limit: int = 50) -> List[int]:
     """
-    Check all blog post titles for a specific keyword 
-    @param: query - keyword to search
-    @return - list of all post ids with query in title, -1 indicates keyword not found
+    Search blog posts (title, content and tags) for keywords, case-insensitively.
+    @param: query - keyword(s) to search; every word must match
+    @param: limit - OPTIONAL; max number of ids
+    @return - list of matching post ids, best match first; empty if nothing matches
     """
-    response = requests.get(f"{SERVER_URL}/posts")
-    posts = [BlogPost(**post) for post in response.json()]
-    return [int(post.id) if (query in post.title.lower()) else -1 for post in posts]
+    response = expect_ok(await blog.get(ctx, "/posts/search", params={"q": query, "limit": limit}), "searching posts")
+    return [hit["id"] for hit in response.json()]
 
 @mcp.tool()
+@tracer.tool
+async def search_posts(ctx: Context, query: str, limit: int = 10) -> List[SearchHit]:
+    """
+    Full-text search of blog posts with ranked snippets.
+    @param: query - keyword(s) to search; every word must match
+    @param: limit - OPTIONAL; max number of results
+    @return - list of SearchHit (id, title, snippet, score), best match first
+    """
+    response = expect_ok(await blog.get(ctx, "/posts/search", params={"q": query, "limit": limit}), "searching posts")
+    return [SearchHit(**hit) for hit in response.json()]
+
+@mcp.tool()
+@tracer.tool
 async def create_post(title: str, content: str, tags: List[str], ctx: Context) -> str:
     """
     Create a new blog post.
@@ -106,39 +309,62 @@ async def create_post(title: str, content: str, tags: List[str], ctx: Context) -
     @param: tags - list of strings that represent topic area
     @return - success/failure message
     """
-    content = re.sub(r"\\n(?=\s|$)", "\n", content)
-    extras = ["fenced-code-blocks", 
-              "code-friendly",
-              "highlightjs-lang"
-              "tables",
-              "strike",
-              "cuddled-lists",
-              "break-on-newline"]
-    html = markdown2.markdown(content, extras=extras)
-    # logging
+    # the blog server normalizes, renders and stores the markdown source
     await ctx.info(content)
-    await ctx.info(html)
-    response = requests.post(f"{SERVER_URL}/posts", json={
+    response = await blog.post(ctx, "/posts", json={
         "title": title,
-        "content": html,
-        "tags": ",".join(tags)
+        "markdown": content,
+        "tags": tags
     })
-    if response.ok:
+    if response.is_success:
         return "Successfully created post. Do not call this tool again. You have completed your task."
     return "Error creating post."
 
+class PostCreate(BaseModel):
+    title: str = Field(description="Title of the new post.")
+    content: str = Field(description="Body of the new post, as markdown.")
+    tags: List[str] = Field(default_factory=list, description="Topic tags.")
+
 @mcp.tool()
-def delete_posts(post_id: List[int]) -> str:
+@tracer.tool
+async def create_posts(posts: List[PostCreate], ctx: Context) -> str:
     """
-    Delete blog post(s) by ID.
-    @param: id - list of primary keys of posts to delete
-    @return - success/failure message
+    Create several blog posts in one call.
+    @param: posts - list of PostCreate (title, content as markdown, tags); at most 1000 per call
+    @return - ids of the created posts, and which were invalid
+    """
+    if len(posts) > MAX_BULK:
+        return f"At most {MAX_BULK} posts per call; split them into several calls."
+    response = expect_ok(await blog.post(ctx, "/posts/bulk", json={
+        "posts": [{"title": p.title, "markdown": p.content, "tags": p.tags} for p in posts]
+    }), "creating posts")
+    return bulk_summary("created", response)
+
+@mcp.tool()
+@tracer.tool
+async def delete_posts(
+        ctx: Context,
+        post_ids: List[int] | None = None,
+        start_id: int | None = None,
+        end_id: int | None = None
+    ) -> str:
+    """
+    Delete blog posts by ID list, or every post in an inclusive ID range, in one call.
+    @param: post_ids - OPTIONAL; primary keys of posts to delete
+    @param: start_id - OPTIONAL; first id of a range to delete (with end_id)
+    @param: end_id - OPTIONAL; last id of a range to delete (with start_id); at most 1000 ids per range
+    @return - which posts were deleted or not found
     """
-    for id in post_id:
-        response = requests.delete(f"{SERVER_URL}/posts/{id}")
-        if not response.ok:
-            return "Error deleting post."
-    return "Success"
+    if post_ids:
+        body = {"ids": post_ids}
+    elif start_id is not None and end_id is not None:
+        if end_id - start_id + 1 > MAX_BULK:
+            return f"A range may cover at most {MAX_BULK} ids; split it into several calls."
+        body = {"start": start_id, "end": end_id}
+    else:
+        return "Provide post_ids, or both start_id and end_id."
+    response = await blog.delete(ctx, "/posts/bulk", json=body)
+    return bulk_summary("deleted", response)
 
 @mcp.prompt(title="Update Post")
 def update_post_prompt(
@@ -163,9 +389,9 @@ def update_post_prompt(
 def delete_post_prompt(ids: str) -> str:
     """Prompt for deleting blog post(s)"""
     system_prompt = f"\
-    You are to delete the following specified blog posts by calling the tool `delete_post`.\
-    If there is a hyphen, you are to delete all posts between the specified numbers.\
-    if there are Comma-separated values, then you are to delete each entry.\
+    You are to delete the following specified blog posts with ONE call to the tool `delete_posts`.\
+    If there is a hyphen, pass the numbers on either side as start_id and end_id.\
+    If there are Comma-separated values, pass them all as post_ids.\
     IDs of posts to delete: {ids}"
     return system_prompt
 
@@ -1,28 +1,92 @@
 """
 MCP server for managing email interactions.
-- Read Emails, Send Emails, Summarize Emails
+- Read Emails, Search Emails, Send Emails, Summarize Emails
+Reads are served from a local mirror (gmail/mirror.py) kept current by a background
+history sync every GMAIL_SYNC_INTERVAL seconds, so they never wait on the Gmail API.
 """
 from mcp.server.fastmcp import FastMCP
-from gmail import read_mail, send_mail
+from gmail import send_mail
+from gmail.client import get_client
+from gmail.mirror import Mirror, format_row
+from tracing.spans import Tracer
+import asyncio, os, sys, threading
 
 mcp = FastMCP("Email Server", version="0.1.0")
+tracer = Tracer("mcp_email")
+
+SYNC_INTERVAL = float(os.environ.get("GMAIL_SYNC_INTERVAL", 60))
+
+_mirror = None
+_mirror_lock = threading.Lock()
+
+def get_mirror() -> Mirror:
+    global _mirror
+    with _mirror_lock:
+        if _mirror is None:
+            _mirror = Mirror()
+        return _mirror
+
+async def ready_mirror() -> Mirror:
+    """The mirror, synced at least once (the first call may wait for a full sync)."""
+    mirror = get_mirror()
+    if mirror.get_state("history_id") is None:
+        await asyncio.to_thread(mirror.sync)
+    return mirror
 
 
 @mcp.tool(title="Read Emails", description="List the latest emails in your inbox.")
-def read_emails() -> str:
-    """Read the latest 5 emails."""
-    return read_mail.read_latest_emails()
+@tracer.tool
+async def read_emails(max_results: int = 5, query: str | None = None) -> str:
+    """
+    Read the latest emails (sender, subject, snippet), newest first.
+    @param: max_results - OPTIONAL; number of emails
+    @param: query - OPTIONAL; filter such as "from:ada@example.com is:unread invoice"
+    """
+    mirror = await ready_mirror()
+    rows = mirror.query(query, max_results)
+    return "".join(format_row(r) for r in rows) or "No messages found."
+
+@mcp.tool(title="Search Emails", description="Full-text search over your mailbox, best match first.")
+@tracer.tool
+async def search_emails(query: str, max_results: int = 10) -> str:
+    """
+    Search subjects, senders and snippets; matches are wrapped in [ ].
+    @param: query - words to find, optionally with from:/to:/subject:/is:/in:/label: filters
+    @param: max_results - OPTIONAL; number of emails
+    """
+    mirror = await ready_mirror()
+    rows = mirror.query(query, max_results, rank=True)
+    return "".join(format_row(r) for r in rows) or "No messages found."
+
+@mcp.tool(title="Sync Emails", description="Pull the latest changes from Gmail into the local mirror now.")
+@tracer.tool
+async def sync_emails() -> str:
+    stats = await asyncio.to_thread(get_mirror().sync)
+    return f"Mirror synced: {stats}"
 
 @mcp.tool(title="Send Email", description="Send an email to a specified recipient.")
-def send_email(to: str, subject: str, body: str) -> str:
-    sent = send_mail.send_email(to, subject, body)
+@tracer.tool
+async def send_email(to: str, subject: str, body: str) -> str:
+    with tracer.span("gmail.send"):
+        sent = await asyncio.to_thread(send_mail.send_email, to, subject, body)
     if sent:
         return f"Email sent successfully to {to} with subject '{subject}'."
     else:
         return "Failed to send email."
 
+def _warm_up():
+    try:
+        get_client().warm_up()
+    except Exception as e:
+        # tools will retry on first use and surface the error there
+        print(f"→ Gmail warm-up failed: {e}", file=sys.stderr)
+        return
+    get_mirror().start_background_sync(SYNC_INTERVAL)
+
 def main():
     """Entry point for the direct execution server."""
+    # build the shared client while the host is still handshaking
+    threading.Thread(target=_warm_up, name="gmail-warm-up", daemon=True).start()
     mcp.run()
 
 if __name__ == "__main__":
@@ -11,46 +11,309 @@ Methods:
 from mcp.server.fastmcp import FastMCP, Context
 from mcp.server.fastmcp.prompts import base
 from mcp.types import TextContent, SamplingMessage
-import pickle, numpy as np, faiss
-from sentence_transformers import SentenceTransformer
+import asyncio, os, sys, threading, time, numpy as np, faiss
 from typing import List, Optional
 import markdown2
+from rag import ann, embedding, packing
+from rag.batching import MicroBatcher, Busy
+from rag.cache import QueryCache
+from rag.chunk_store import ChunkStore
+from rag.paths import INDEX_PATH, STORE_PATH      # $RAG_INDEX_PATH / $RAG_STORE_PATH
+from tracing.spans import Tracer, attach, current_span
 
 # Create an MCP server
 mcp = FastMCP("Obsidian Note Indexer", version="0.1.0")
 
+_T0 = time.perf_counter()
+tracer = Tracer("mcp_files")
+
+MODEL_NAME = embedding.MODEL_NAME
+
 # — Load FAISS + metadata —
-idx    = faiss.read_index(r"/home/neilc/Projects/machine-learning/mcp_tools/rag/docs_index.faiss")
-with open(r"/home/neilc/Projects/machine-learning/mcp_tools/rag/docs_metadata.pkl", "rb") as f:
-    chunks = pickle.load(f)
+def index_version():
+    """Identity of the index file on disk; changes whenever the embedder rewrites it."""
+    st = os.stat(INDEX_PATH)
+    return (st.st_mtime_ns, st.st_size)
+
+def load_store():
+    """(Re)open the index and chunk store; both are memory-mapped, not read into RAM."""
+    global idx, store, store_version
+    store_version = index_version()
+    idx   = faiss.read_index(str(INDEX_PATH), faiss.IO_FLAG_MMAP)
+    store = ChunkStore(STORE_PATH)
+
+# — Background warm-up: the model and index load while the server already answers the handshake —
+embed_model  = None
+startup      = {"warm_s": None, "first_result_s": None}
+_warm        = threading.Event()
+_warm_error  = None
+_warm_thread = None
+_warm_lock   = threading.Lock()
+
+def _log(msg: str):
+    # stdout carries the MCP stdio transport
+    print(f"[mcp_files +{time.perf_counter() - _T0:.3f}s] {msg}", file=sys.stderr, flush=True)
 
-# — Embedder reused for queries —
-embed_model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+def _warm_up(embedder=None):
+    global embed_model, _warm_error
+    try:
+        load_store()
+        # one shared model instance via rag.embed_service when it runs, else loaded here
+        embed_model = embedder or embedding.get_embedder(MODEL_NAME)
+        embed_model.encode(["warm-up"], convert_to_numpy=True)
+        startup["warm_s"] = round(time.perf_counter() - _T0, 3)
+        _log(f"warm-up done ({idx.ntotal} vectors, {type(embed_model).__name__})")
+    except BaseException as e:
+        _warm_error = e
+        _log(f"warm-up failed: {e!r}")
+    finally:
+        _warm.set()
 
-def retrieve(query: str, k: int = 5):
-    q_emb = embed_model.encode([query], convert_to_numpy=True)
-    faiss.normalize_L2(q_emb)
-    _, ids = idx.search(q_emb, k)
-    return [chunks[i] for i in ids[0]]
+def start_warm_up(embedder=None):
+    """
+    Start loading the model and index in the background (idempotent).
+    @param: embedder - OPTIONAL; use this instead of loading MODEL_NAME (e.g. bench.rag_bench)
+    """
+    global _warm_thread
+    with _warm_lock:
+        if _warm_thread is None:
+            _warm_thread = threading.Thread(target=_warm_up, args=(embedder,), name="mcp_files-warmup", daemon=True)
+            _warm_thread.start()
+
+def ensure_ready():
+    """Block until warm-up has finished; only the first tool calls ever wait."""
+    if not _warm.is_set():
+        start_warm_up()
+        _warm.wait()
+    if _warm_error is not None:
+        raise RuntimeError("mcp_files failed to load its model/index") from _warm_error
+
+# — Query cache: embeddings + top-k IDs, dropped when the index changes —
+query_cache = QueryCache(
+    maxsize=int(os.environ.get("RAG_CACHE_SIZE", 1024)),
+    ttl=float(os.environ.get("RAG_CACHE_TTL", 600))
+)
+
+def retrieve_many(
+        queries: List[str],
+        k: int | List[int] = 5,
+        min_score: Optional[float] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None
+    ) -> List[List[dict]]:
+    """
+    Top-k chunks for several queries with one batched encode and one index search.
+    @param: k - hits per query, or one k per query
+    @param: min_score - OPTIONAL; drop hits with cosine similarity below this
+    @param: nprobe - OPTIONAL; IVF lists to visit (IVF indexes only)
+    @param: ef_search - OPTIONAL; HNSW candidate list size (HNSW indexes only)
+    @return - per query, a list of chunk dicts with an added "score"
+    """
+    ks = [k] * len(queries) if isinstance(k, int) else list(k)
+    if len(ks) != len(queries):
+        raise ValueError(f"Got {len(ks)} values of k for {len(queries)} queries")
+    if not queries:
+        return []
+    ensure_ready()
+
+    # pick up a re-indexed store, which also invalidates the cache
+    if index_version() != store_version:
+        load_store()
+    query_cache.validate(store_version)
+
+    # 1. Serve what we can from the cache
+    params  = (nprobe, ef_search)
+    entries = [query_cache.get(q) for q in queries]
+    results = [None] * len(queries)
+    for n, (e, kq) in enumerate(zip(entries, ks)):
+        if e and e["ids"] is not None and e["params"] == params and len(e["ids"]) >= kq:
+            results[n] = (e["scores"][:kq], e["ids"][:kq])
+            query_cache.record(hit=True)
+
+    # 2. Encode only queries without a cached embedding
+    todo    = [n for n in range(len(queries)) if results[n] is None]
+    missing = [n for n in todo if entries[n] is None]
+    embs    = {n: entries[n]["emb"] for n in todo if entries[n] is not None}
+    if missing:
+        with tracer.span("encode", queries=len(missing)):
+            q_emb = embed_model.encode([queries[n] for n in missing], convert_to_numpy=True)
+            faiss.normalize_L2(q_emb)
+        embs.update(zip(missing, q_emb))
+    for n in todo:
+        query_cache.record(hit=False, partial=entries[n] is not None)
+
+    # 3. One search over the remaining queries
+    if todo:
+        q_emb = np.stack([embs[n] for n in todo])
+        with tracer.span("search", queries=len(todo), k=max(ks[n] for n in todo)):
+            scores, ids = ann.search(idx, q_emb, max(ks[n] for n in todo), nprobe=nprobe, ef_search=ef_search)
+        for n, row_s, row_i in zip(todo, scores, ids):
+            query_cache.put(queries[n], embs[n], row_i, row_s, params)
+            results[n] = (row_s[:ks[n]], row_i[:ks[n]])
+
+    # only the returned chunks are read from the store; deleted ones come back as None
+    with tracer.span("fetch_chunks", queries=len(queries), cached=len(queries) - len(todo)):
+        return [
+            [{**c, "score": float(s)} for s, i in zip(row_s, row_i)
+             if i != -1 and (min_score is None or s >= min_score) and (c := store.get(i)) is not None]
+            for row_s, row_i in results
+        ]
+
+def query_vectors(queries: List[str]) -> np.ndarray:
+    """Normalized query embeddings, from the cache where possible."""
+    entries = [query_cache.get(q) for q in queries]
+    missing = [q for q, e in zip(queries, entries) if e is None]
+    fresh   = iter(())
+    if missing:
+        embs = embed_model.encode(missing, convert_to_numpy=True)
+        faiss.normalize_L2(embs)
+        fresh = iter(embs)
+    return np.stack([e["emb"] if e is not None else next(fresh) for e in entries])
+
+def hit_vectors(hits: List[dict]) -> np.ndarray:
+    """
+    Stored vectors of hits. Flat and HNSW indexes reconstruct them; IVF indexes (ivf_flat as well as
+    ivf_pq) keep no direct map and cannot, so with those every MMR call re-encodes its hits' texts.
+    """
+    try:
+        return idx.reconstruct_batch(np.array([h["id"] for h in hits], dtype="int64"))
+    except RuntimeError:
+        embs = embed_model.encode([h["text"] for h in hits], convert_to_numpy=True)
+        faiss.normalize_L2(embs)
+        return embs
+
+def rerank_mmr(topics: List[str], per_topic: List[List[dict]], ks: List[int]) -> List[List[dict]]:
+    """Diversify each topic's candidates down to its k with MMR."""
+    q_vecs = query_vectors(topics)
+    return [packing.mmr(hits, hit_vectors(hits), q, kq) if hits else hits
+            for hits, q, kq in zip(per_topic, q_vecs, ks)]
+
+def retrieve(query: str, k: int = 5, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """Top-k chunks for a single query."""
+    return retrieve_many([query], k, nprobe=nprobe, ef_search=ef_search)[0]
+
+def pack_context(job: dict, found: dict) -> str:
+    """One get_context answer from the shared search results."""
+    per_topic = [found[t][:3 * kq if job["diversify"] else kq] for t, kq in zip(job["topics"], job["ks"])]
+    if job["min_score"] is not None:
+        per_topic = [[h for h in t if h["score"] >= job["min_score"]] for t in per_topic]
+    if job["diversify"]:
+        with attach(job["parent"]), tracer.span("mmr", topics=len(job["topics"])):
+            per_topic = rerank_mmr(job["topics"], per_topic, job["ks"])
+
+    with attach(job["parent"]), tracer.span("pack", topics=len(job["topics"])):
+        full_context = f"CONTEXT FOR TOPIC(s): {job['topics']}\n\n"
+        for t, spans in zip(job["topics"], packing.pack(per_topic, job["token_budget"])):
+            # Merge top‑k chunks into context
+            context = "\n\n".join(f"{packing.span_label(s)}\n{s['text']}" for s in spans)
+            full_context += f"## Context for TOPIC: {t}\n\n{context}\n\n"
+    return full_context
+
+def build_contexts(jobs: List[dict]) -> List[str | Exception]:
+    """
+    Answer several get_context calls with one batched encode and one index search.
+    Runs on the retrieval worker thread, never on the event loop; each job carries the span of
+    its get_context call, and the shared stages are recorded under the first job's.
+    A job that fails gets its exception as its result, so it fails only its own call.
+    """
+    # the same topic from several calls is searched once, at the largest k asked for
+    wanted = {}
+    for job in jobs:
+        for t, kq in zip(job["topics"], job["ks"]):
+            wanted[t] = max(wanted.get(t, 0), 3 * kq if job["diversify"] else kq)
+    try:
+        with attach(jobs[0]["parent"]), tracer.span("retrieve", calls=len(jobs), topics=len(wanted),
+                                                     shared_with=[j["parent"] for j in jobs[1:]]):
+            found = dict(zip(wanted, retrieve_many(list(wanted), list(wanted.values()))))
+    except Exception as e:
+        if len(jobs) == 1:
+            return [e]
+        # retry the calls one by one so only the one that broke the shared search fails
+        return [build_contexts([job])[0] for job in jobs]
+
+    out = []
+    for job in jobs:
+        try:
+            out.append(pack_context(job, found))
+        except Exception as e:
+            out.append(e)
+    return out
+
+# — Retrieval worker: calls arriving while a batch runs are coalesced into the next one —
+retrieval_batcher = MicroBatcher(
+    build_contexts,
+    max_batch=int(os.environ.get("RAG_MAX_BATCH", 16)),
+    max_wait=float(os.environ.get("RAG_BATCH_WAIT_MS", 2)) / 1000,
+    max_queue=int(os.environ.get("RAG_MAX_QUEUE", 64)),
+    name="mcp_files-retrieval"
+)
 
 # — MCP Tools —
 
 @mcp.tool(title="Find Relevant Documents")
-def get_context(topics: List[str]) -> str:
+@tracer.tool
+async def get_context(
+        topics: List[str],
+        k: int | List[int] = 5,
+        min_score: Optional[float] = None,
+        token_budget: Optional[int] = None,
+        diversify: bool = False
+    ) -> str:
     """
     Utilize the vector database to retrieve relevant chunks to answer a query.
+    Chunks shared between topics appear once, and neighbouring chunks of a note are merged.
     @params : topics - list of strings to query
+    @params : k - OPTIONAL; chunks per topic, or a list with one count per topic
+    @params : min_score - OPTIONAL; minimum cosine similarity (0-1) for a chunk to be included
+    @params : token_budget - OPTIONAL; approximate token cap for the whole response
+    @params : diversify - OPTIONAL; rerank with MMR to prefer chunks that add new information
     @return : strings of context for each query
     """
-    full_context = f"CONTEXT FOR TOPIC(s): {topics}\n\n"
-    for t in topics:
-        hits = retrieve(t, k=5)
-        # Merge top‑k chunks into context
-        context = "\n\n".join(f"[{h['source']}#{h['idx']}]\n{h['text']}" for h in hits)
-        full_context += f"## Context for TOPIC: {t}\n\n{context}\n\n"
+    ks = [k] * len(topics) if isinstance(k, int) else list(k)
+    # checked here rather than on the worker, where a bad call would share a batch with good ones
+    if not topics or not all(isinstance(t, str) and t.strip() for t in topics):
+        raise ValueError("topics must be a non-empty list of non-empty strings")
+    if len(ks) != len(topics):
+        raise ValueError(f"Got {len(ks)} values of k for {len(topics)} topics")
+    if any(kq < 1 for kq in ks):
+        raise ValueError(f"k must be at least 1, got {k}")
+    if token_budget is not None and token_budget < 1:
+        raise ValueError(f"token_budget must be positive, got {token_budget}")
+    job = {"topics": topics, "ks": ks, "min_score": min_score, "token_budget": token_budget, "diversify": diversify,
+           "parent": current_span()}
+    try:
+        fut = retrieval_batcher.submit([job])
+    except Busy:
+        raise RuntimeError("get_context is overloaded right now; retry shortly")
+    (full_context,) = await asyncio.wrap_future(fut)
+    if isinstance(full_context, Exception):
+        raise full_context
 
+    if startup["first_result_s"] is None:
+        startup["first_result_s"] = round(time.perf_counter() - _T0, 3)
+        _log("first result returned")
     return full_context
 
+@mcp.tool(title="Retrieval Cache Stats")
+def cache_stats() -> dict:
+    """
+    Hit/miss counters of the query cache behind `get_context`, plus retrieval batching counters.
+    @return : size, hits, embedding_hits (encode skipped, search redone), misses, hit_rate, evictions, invalidations,
+              batches, requests (get_context calls served), pending (queued calls)
+    """
+    return {**query_cache.stats(),
+            "batches": retrieval_batcher.batches,
+            "requests": retrieval_batcher.items,
+            "pending": retrieval_batcher.pending()}
+
+@mcp.tool(title="Startup Stats")
+def startup_stats() -> dict:
+    """
+    Seconds from process start until the model/index finished loading and until the first get_context result.
+    @return : warm_s, first_result_s (None until reached)
+    """
+    return dict(startup)
+
 # — MCP Prompts —
 
 @mcp.prompt(title="Knowledge Base Prompt")
@@ -77,6 +340,8 @@ def summarize_information_prompt(prompt: str) -> str:
 
 def main():
     """Entry point for the direct execution server."""
+    start_warm_up()
+    _log("serving")
     mcp.run()
 
 
@@ -0,0 +1,193 @@
+# test_gmail.py
+"""
+read_mail and the mailbox mirror against gmail.fake_api, over real HTTP.
+    python -m pytest tests
+"""
+import time
+import pytest
+from googleapiclient.errors import HttpError
+from gmail import mirror as mirror_mod, read_mail
+from gmail.fake_api import FakeGmail
+from gmail.mirror import Mirror
+from gmail.read_mail import BATCH_SIZE, PAGE_SIZE, get_messages, list_messages
+
+
+@pytest.fixture
+def fake():
+    fake = FakeGmail().start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def service(fake):
+    return fake.client().service()
+
+
+@pytest.fixture
+def mirror(fake, tmp_path):
+    mirror = Mirror(tmp_path / "mailbox.db", client=fake.client())
+    yield mirror
+    mirror.close()
+
+
+def ids_newest_first(fake: FakeGmail) -> list:
+    return [m["id"] for m in sorted(fake.messages.values(), key=lambda m: int(m["internalDate"]), reverse=True)]
+
+
+def test_list_messages_follows_pages(fake, service):
+    fake.populate(2 * PAGE_SIZE + 100)
+    calls = fake.calls
+    messages = list_messages(service, max_results=2 * PAGE_SIZE + 50)
+    assert [m["id"] for m in messages] == ids_newest_first(fake)[:2 * PAGE_SIZE + 50]
+    assert fake.calls - calls == 3          # 500 + 500 + 50
+
+
+def test_list_messages_stops_when_mailbox_runs_out(fake, service):
+    fake.populate(30)
+    assert len(list_messages(service, max_results=PAGE_SIZE)) == 30
+    assert list_messages(service, max_results=10, query="no-such-word") == []
+
+
+def test_get_messages_batches_metadata(fake, service):
+    fake.populate(2 * BATCH_SIZE + 20)
+    ids = ids_newest_first(fake)
+    requests, calls = fake.requests, fake.calls
+    msgs = get_messages(service, ids, ["From", "Subject"])
+    assert fake.requests - requests == 3    # one HTTP request per BATCH_SIZE ids
+    assert fake.calls - calls == len(ids)
+    assert msgs.keys() == set(ids)
+    payload = msgs[ids[0]]["payload"]
+    assert {h["name"] for h in payload["headers"]} == {"From", "Subject"}
+    assert "body" not in payload
+
+
+def test_get_messages_leaves_out_missing_ids(fake, service, capsys):
+    fake.populate(3)
+    ids = ids_newest_first(fake)
+    msgs = get_messages(service, ids + ["ffffffffffffffff"])
+    assert msgs.keys() == set(ids)
+    assert "ffffffffffffffff" in capsys.readouterr().err
+
+
+def test_first_sync_is_full(fake, mirror):
+    fake.populate(120)
+    stats = mirror.sync()
+    assert stats["mode"] == "full" and stats["messages"] == 120
+    assert len(mirror) == 120
+    assert mirror.get_state("history_id") == str(fake.history_id)
+    assert [r["id"] for r in mirror.query(limit=5)] == ids_newest_first(fake)[:5]
+
+
+def test_incremental_sync_applies_history(fake, mirror):
+    fake.populate(20)
+    mirror.sync()
+    ids = ids_newest_first(fake)
+    new_id = fake.add_message("ada@example.com", "Quarterly invoice", "Please find the invoice attached.")
+    fake.delete_message(ids[1])
+    fake.set_labels(ids[2], add=["STARRED"], remove=["UNREAD"])
+    requests = fake.requests
+
+    stats = mirror.sync()
+    assert stats["mode"] == "incremental"
+    assert (stats["updated"], stats["deleted"]) == (2, 1)
+    assert fake.requests - requests == 2    # history.list + one batch
+    assert len(mirror) == 20
+    assert [r["id"] for r in mirror.query("invoice from:ada")] == [new_id]
+    assert [r["id"] for r in mirror.query("is:starred")] == [ids[2]]
+    assert ids[1] not in {r["id"] for r in mirror.query(limit=100)}
+    assert mirror.get_state("history_id") == str(fake.history_id)
+
+
+def test_incremental_sync_ignores_messages_deleted_before_fetch(fake, mirror):
+    fake.populate(5)
+    mirror.sync()
+    msg_id = fake.add_message("bob@example.com", "Gone soon", "short lived")
+    fake.delete_message(msg_id)
+    stats = mirror.sync()
+    assert stats["updated"] == 0
+    assert len(mirror) == 5
+
+
+def test_incremental_sync_trims_to_mirror_limit(fake, mirror, monkeypatch):
+    monkeypatch.setattr(mirror_mod, "MIRROR_LIMIT", 10)
+    fake.populate(15)
+    assert mirror.sync()["messages"] == 10
+    for i in range(3):
+        fake.add_message("ada@example.com", f"New {i}", "fresh", when=time.time() + i)
+    stats = mirror.sync()
+    assert stats["mode"] == "incremental" and stats["trimmed"] == 3
+    assert [r["id"] for r in mirror.query(limit=100)] == ids_newest_first(fake)[:10]
+
+
+def test_expired_history_falls_back_to_full_sync(fake, mirror):
+    fake.populate(10)
+    mirror.sync()
+    gone = ids_newest_first(fake)[0]
+    fake.delete_message(gone)
+    fake.add_message("ada@example.com", "After expiry", "hello")
+    fake.expire_history()
+
+    stats = mirror.sync()
+    assert stats["mode"] == "full" and stats["messages"] == 10
+    assert {r["id"] for r in mirror.query(limit=100)} == set(fake.messages)
+    assert mirror.get_state("history_id") == str(fake.history_id)
+    assert mirror.sync()["mode"] == "incremental"
+
+
+def test_spam_and_trash_leave_the_mirror(fake, mirror):
+    fake.populate(10)
+    mirror.sync()
+    trashed = ids_newest_first(fake)[0]
+    fake.set_labels(trashed, add=["TRASH"], remove=["INBOX"])
+    spam = fake.add_message("spammer@example.com", "You won", "claim your prize", labels=("SPAM",))
+
+    stats = mirror.sync()
+    assert stats["mode"] == "incremental" and stats["deleted"] == 2
+    found = {r["id"] for r in mirror.query(limit=100)}
+    assert trashed not in found and spam not in found
+    assert len(mirror) == 9
+    assert not mirror.query("prize")
+
+
+def test_full_sync_leaves_out_spam_and_trash(fake, mirror):
+    fake.populate(5)
+    fake.set_labels(ids_newest_first(fake)[0], add=["TRASH"], remove=["INBOX"])
+    assert mirror.sync()["messages"] == 4
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(read_mail, "RETRY_BACKOFF_S", (0, 0, 0))
+
+
+def test_get_messages_retries_rate_limited_parts(fake, service, no_backoff):
+    fake.populate(2 * BATCH_SIZE)
+    ids = ids_newest_first(fake)
+    fake.fail_gets(ids[:30], times=2)
+    requests = fake.requests
+    msgs = get_messages(service, ids)
+    assert msgs.keys() == set(ids)
+    assert fake.requests - requests == 2 + 2 + 3        # 2 batches, then the 30 ids 25 and 12 per batch
+
+
+def test_get_messages_raises_when_retries_run_out(fake, service, no_backoff):
+    fake.populate(5)
+    fake.fail_gets(ids_newest_first(fake)[:1], times=10)
+    with pytest.raises(HttpError) as e:
+        get_messages(service, ids_newest_first(fake))
+    assert e.value.resp.status == 429
+
+
+def test_sync_never_commits_a_partial_mailbox(fake, mirror, no_backoff):
+    fake.populate(10)
+    mirror.sync()
+    ids = ids_newest_first(fake)
+    fake.set_labels(ids[0], add=["STARRED"])
+    fake.fail_gets(ids[:1], times=10)
+    with pytest.raises(HttpError):
+        mirror.sync()
+    assert len(mirror) == 10 and not mirror.query("is:starred")
+    fake.failures.clear()
+    assert mirror.sync()["updated"] == 1
+    assert [r["id"] for r in mirror.query("is:starred")] == [ids[0]]
@@ -0,0 +1,137 @@
+# metrics.py
+"""
+Turn the span files in TRACE_DIR into latency numbers.
+- serve  : Prometheus text endpoint; every scrape reads only the lines appended since the last one
+           mcp_span_duration_seconds{service, span} histogram, mcp_span_errors_total{service, span}
+- summary: per (service, span) count, p50/p99/max ms and total seconds, for one trace or all
+    python -m tracing.metrics serve --port 9464
+    python -m tracing.metrics summary --trace 3f2a...
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+import json, threading
+import typer
+from .spans import TRACE_DIR
+
+app = typer.Typer()
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def read_spans(trace_dir: Path = TRACE_DIR, trace: str | None = None):
+    for path in sorted(trace_dir.glob("spans-*.jsonl")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    span = json.loads(line)
+                except ValueError:
+                    continue            # a line still being written
+                if trace is None or span["trace"] == trace:
+                    yield span
+
+
+def percentile(samples: list, q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+
+
+class Collector:
+    """Cumulative histograms over every span file, read incrementally."""
+    def __init__(self, trace_dir: Path = TRACE_DIR):
+        self.trace_dir = trace_dir
+        self.offsets = {}           # path -> bytes consumed
+        self.series  = {}           # (service, span) -> {"buckets", "count", "sum", "errors"}
+        self._lock   = threading.Lock()
+
+    def _observe(self, span: dict):
+        s = self.series.setdefault((span["service"], span["name"]),
+                                   {"buckets": [0] * len(BUCKETS), "count": 0, "sum": 0.0, "errors": 0})
+        seconds = span["ms"] / 1000
+        for n, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                s["buckets"][n] += 1
+        s["count"] += 1
+        s["sum"]   += seconds
+        s["errors"] += span.get("error") is not None
+
+    def collect(self):
+        for path in sorted(self.trace_dir.glob("spans-*.jsonl")):
+            with open(path, "rb") as f:
+                f.seek(self.offsets.get(path, 0))
+                data = f.read()
+            end = data.rfind(b"\n") + 1         # leave a partial last line for the next scrape
+            self.offsets[path] = self.offsets.get(path, 0) + end
+            for line in data[:end].splitlines():
+                try:
+                    self._observe(json.loads(line))
+                except (ValueError, KeyError):
+                    continue
+
+    def render(self) -> str:
+        with self._lock:
+            self.collect()
+            out = ["# HELP mcp_span_duration_seconds Duration of traced spans.",
+                   "# TYPE mcp_span_duration_seconds histogram"]
+            for (service, name), s in sorted(self.series.items()):
+                labels = f'service="{service}",span="{name}"'
+                out += [f'mcp_span_duration_seconds_bucket{{{labels},le="{b}"}} {c}' for b, c in zip(BUCKETS, s["buckets"])]
+                out += [f'mcp_span_duration_seconds_bucket{{{labels},le="+Inf"}} {s["count"]}',
+                        f"mcp_span_duration_seconds_sum{{{labels}}} {s['sum']:.6f}",
+                        f"mcp_span_duration_seconds_count{{{labels}}} {s['count']}"]
+            out += ["# HELP mcp_span_errors_total Spans that ended with an exception.",
+                    "# TYPE mcp_span_errors_total counter"]
+            out += [f'mcp_span_errors_total{{service="{service}",span="{name}"}} {s["errors"]}'
+                    for (service, name), s in sorted(self.series.items())]
+            return "\n".join(out) + "\n"
+
+
+def summarize(spans) -> list:
+    grouped = {}
+    for span in spans:
+        grouped.setdefault((span["service"], span["name"]), []).append(span["ms"])
+    return [{"service": service, "span": name, "count": len(ms),
+             "p50_ms": round(percentile(ms, 0.50), 2), "p99_ms": round(percentile(ms, 0.99), 2),
+             "max_ms": round(max(ms), 2), "total_s": round(sum(ms) / 1000, 3)}
+            for (service, name), ms in sorted(grouped.items(), key=lambda kv: -sum(kv[1]))]
+
+
+@app.command()
+def serve(
+        host: str = typer.Option("127.0.0.1", help="Bind address"),
+        port: int = typer.Option(9464, help="Port"),
+        trace_dir: Path = typer.Option(TRACE_DIR, help="Directory with the span files")
+    ):
+    """Serve span latencies as Prometheus metrics on /metrics."""
+    collector = Collector(trace_dir)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = collector.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    print(f"→ Metrics for {trace_dir} on http://{host}:{port}/metrics")
+    ThreadingHTTPServer((host, port), Handler).serve_forever()
+
+
+@app.command()
+def summary(
+        trace: str = typer.Option(None, help="Only this trace id"),
+        trace_dir: Path = typer.Option(TRACE_DIR, help="Directory with the span files")
+    ):
+    """Where the time went: spans grouped by service and name, slowest total first."""
+    for row in summarize(read_spans(trace_dir, trace)):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    app()
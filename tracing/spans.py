@@ -0,0 +1,222 @@
+# spans.py
+"""
+Lightweight spans for the agent runner and the MCP servers.
+Each process appends finished spans, one JSON object per line, to
+    TRACE_DIR/spans-<service>-<pid>.jsonl
+{"trace", "span", "parent", "service", "name", "start" (epoch s), "ms", "attrs", "error"}.
+
+Tracing is on while a runner's TRACE_DIR/context-<pid>.json exists and its heartbeat is fresh.
+The runner writes it (start_trace) before fast-agent spawns the servers and rewrites it every
+HEARTBEAT_S seconds; one file per runner, so concurrent runs never overwrite each other's.
+A process follows the context of its nearest ancestor (itself, the runner that spawned it),
+or the only live one when none is an ancestor; with several unrelated live runs it stays off.
+fast-agent starts stdio servers with a bare environment, so the file rather than an env var
+carries the trace id across processes. Only the trace id crosses: stdio tool calls carry no
+span id, so a server's tool.* spans are roots within the trace, matched to the runner's
+agent.<name> turns by trace id and time.
+MCP_TRACE=1 turns tracing on without a context file, e.g. for a server started by hand.
+When it is off, span() costs one clock read and returns a shared no-op context manager; the
+context file is re-checked at most every CHECK_INTERVAL seconds.
+
+    tracer = Tracer("mcp_files")
+    with tracer.span("encode", n=len(texts)):
+        ...
+    @tracer.tool                 # under @mcp.tool(): one span per call, named tool.<fn>
+    async def get_context(...): ...
+Work handed to another thread keeps its parent by carrying current_span() along and
+entering attach(parent) there.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+import functools, inspect, json, os, secrets, threading, time
+
+TRACE_DIR      = Path(os.environ.get("MCP_TRACE_DIR", Path(__file__).resolve().parents[1] / "traces"))
+CHECK_INTERVAL = float(os.environ.get("MCP_TRACE_CHECK_S", 1.0))
+HEARTBEAT_S    = 5.0            # a context whose heartbeat is 3x older than this is left over
+FORCE          = os.environ.get("MCP_TRACE", "") == "1"
+
+_current = ContextVar("current_span", default=None)      # span id of the enclosing span
+
+
+class _NoSpan:
+    """Stand-in while tracing is off."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+NO_SPAN = _NoSpan()
+
+
+class Span:
+    def __init__(self, tracer: "Tracer", trace_id: str, name: str, attrs: dict):
+        self.tracer = tracer
+        self.trace  = trace_id
+        self.name   = name
+        self.attrs  = attrs
+        self.id     = secrets.token_hex(8)
+        self.parent = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.parent = _current.get()
+        self._token = _current.set(self.id)
+        self._start = time.time()
+        self._t0    = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ms = (time.perf_counter() - self._t0) * 1000
+        _current.reset(self._token)
+        self.tracer.write({
+            "trace": self.trace, "span": self.id, "parent": self.parent, "service": self.tracer.service,
+            "name": self.name, "start": round(self._start, 6), "ms": round(ms, 3), "attrs": self.attrs,
+            "error": None if exc_type is None else f"{exc_type.__name__}: {exc}"
+        })
+        return False
+
+
+def current_span() -> str | None:
+    """Id of the enclosing span in this context, to hand to another thread."""
+    return _current.get()
+
+
+@contextmanager
+def attach(parent: str | None):
+    """Make `parent` the enclosing span, e.g. on a worker thread doing work for a traced call."""
+    token = _current.set(parent)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def context_path(pid: int) -> Path:
+    return TRACE_DIR / f"context-{pid}.json"
+
+
+def _ancestors() -> list:
+    """This process and its parents, nearest first (the whole chain where /proc exists)."""
+    pids = [os.getpid(), os.getppid()]
+    while pids[-1] > 1:
+        try:
+            stat = Path(f"/proc/{pids[-1]}/stat").read_text()
+        except OSError:
+            break
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        if ppid in pids or ppid <= 0:
+            break
+        pids.append(ppid)
+    return pids
+
+
+def read_context() -> dict | None:
+    """The trace context this process belongs to, or None when there is none (or it is ambiguous)."""
+    live = {}
+    for path in TRACE_DIR.glob("context-*.json"):
+        try:
+            context = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        # a heartbeat rather than a pid probe: os.kill(pid, 0) terminates the process on Windows
+        if time.time() - context.get("heartbeat", 0) > 3 * HEARTBEAT_S:
+            continue            # left behind by a runner that crashed
+        live[context.get("pid")] = context
+    if not live:
+        return None
+    for pid in _ancestors():
+        if pid in live:
+            return live[pid]
+    return next(iter(live.values())) if len(live) == 1 else None
+
+
+def _write_context(context: dict):
+    path = context_path(context["pid"])
+    tmp  = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({**context, "heartbeat": time.time()}), encoding="utf-8")
+    tmp.replace(path)
+
+
+class Tracer:
+    def __init__(self, service: str):
+        self.service = service
+        self._lock   = threading.Lock()
+        self._file   = None
+        self._trace  = None
+        self._next_check = 0.0
+
+    def trace_id(self) -> str | None:
+        """Current trace id, or None while tracing is off."""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + CHECK_INTERVAL
+            context = read_context()
+            self._trace = context["trace"] if context else ("local" if FORCE else None)
+        return self._trace
+
+    def span(self, name: str, **attrs):
+        trace = self.trace_id()
+        if trace is None:
+            return NO_SPAN
+        return Span(self, trace, name, attrs)
+
+    def tool(self, fn):
+        """Decorator: one span per call of an (async) MCP tool, named tool.<function name>."""
+        name = f"tool.{fn.__name__}"
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return await fn(*args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return fn(*args, **kwargs)
+        return wrapper
+
+    def write(self, record: dict):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                TRACE_DIR.mkdir(parents=True, exist_ok=True)
+                self._file = open(TRACE_DIR / f"spans-{self.service}-{os.getpid()}.jsonl", "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+
+
+@contextmanager
+def start_trace(name: str, **attrs):
+    """
+    Turn tracing on for this process and every server it starts, until the block exits.
+    @return - the trace id
+    """
+    trace_id = secrets.token_hex(8)
+    TRACE_DIR.mkdir(parents=True, exist_ok=True)
+    context = {"trace": trace_id, "name": name, "pid": os.getpid(), "started": time.time(), **attrs}
+    _write_context(context)
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(HEARTBEAT_S):
+            try:
+                _write_context(context)
+            except OSError:
+                pass            # a reader holds the file (Windows); the next beat retries
+
+    threading.Thread(target=heartbeat, name="trace-heartbeat", daemon=True).start()
+    try:
+        yield trace_id
+    finally:
+        stop.set()
+        try:
+            context_path(context["pid"]).unlink()
+        except OSError:
+            pass